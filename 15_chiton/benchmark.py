@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Time `multiply` and each pathfinding engine on increasingly tiled maps,
+and write the results as JSON so they can be compared between commits.
+
+Every step runs in its own process at every tile factor, which reports its wall time and its peak resident memory
+(`ru_maxrss`, including the interpreter, and `base_rss` being the peak before the step starts). A step taking longer
+than `--timeout` (600s by default) is stopped and recorded as timed out, which only happens to `numpy` at 50 tiles,
+as its number of sweeps grows with the side of the map.
+
+Tracemalloc gives more precise peak allocations, but slows the Python engines down about 10 times, so that extra
+run is only done up to `--traced-max-tiles` (10 by default). The whole run takes about 25 minutes on a single core.
+
+Usage: ./benchmark.py [--tiles 1 5 10 25 50] [--engines astar dial numpy] [--timeout 600] [--traced-max-tiles 10]
+                      [--output benchmark.json]
+"""
+
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from part1_and_2 import get_grid, get_grid_lower_risk_level, multiply
+
+TILE_FACTORS = [1, 5, 10, 25, 50]
+ENGINES = ["astar", "dial", "numpy"]
+STEPS = ["multiply", *ENGINES]
+STEP_TIMEOUT = 600
+TRACED_MAX_TILES = 10
+
+
+def time_call(fn, *args, **kwargs):
+    start_time = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, round(time.perf_counter() - start_time, 4)
+
+
+def trace_peak_memory(fn, *args, **kwargs):
+    # Done on a separate run from the timing one, since tracing slows down allocations a lot
+    tracemalloc.start()
+    fn(*args, **kwargs)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak_memory
+
+
+def get_peak_rss():
+    # On Linux, `ru_maxrss` is in kilobytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure_step(data, tiles, step, traced):
+    if step == "multiply":
+        args, measure = (data, tiles), {}
+        base_rss = get_peak_rss()
+        _, wall_time = time_call(multiply, *args)
+        fn = multiply
+    else:
+        args, stats = (get_grid(data, tiles), False, step), Counter()
+        base_rss = get_peak_rss()
+        risk_level, wall_time = time_call(get_grid_lower_risk_level, *args, stats)
+        fn, measure = get_grid_lower_risk_level, {"risk_level": risk_level, "nodes_expanded": stats["expanded"]}
+
+    measure.update(wall_time=wall_time, peak_rss=get_peak_rss(), base_rss=base_rss)
+    measure["peak_memory"] = trace_peak_memory(fn, *args) if traced else None
+    return measure
+
+
+def run_step(tiles, step, timeout, traced):
+    # Each step gets a fresh process, so that its peak resident memory isn't hidden by the previous ones
+    command = [sys.executable, __file__, "--measure", str(tiles), step]
+    if traced:
+        command.append("--traced")
+    try:
+        process = subprocess.run(command, capture_output=True, text=True, check=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"timed_out": True, "timeout": timeout}
+    return json.loads(process.stdout)
+
+
+def get_commit():
+    try:
+        process = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return process.stdout.strip()
+
+
+def run_benchmark(
+    tile_factors=TILE_FACTORS, engines=ENGINES, timeout=STEP_TIMEOUT, traced_max_tiles=TRACED_MAX_TILES
+):
+    results = []
+    for tiles in tile_factors:
+        for step in ["multiply", *engines]:
+            measure = run_step(tiles, step, timeout, tiles <= traced_max_tiles)
+            results.append({"tiles": tiles, "step": step, **measure})
+            print(f"{tiles=} {step=} " + " ".join(f"{key}={value}" for key, value in measure.items()))
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tiles", type=int, nargs="+", default=TILE_FACTORS)
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES)
+    parser.add_argument("--timeout", type=int, default=STEP_TIMEOUT)
+    parser.add_argument("--traced-max-tiles", type=int, default=TRACED_MAX_TILES)
+    parser.add_argument("--output", type=Path, default=Path(__file__).parent / "benchmark.json")
+    parser.add_argument("--measure", nargs=2, metavar=("TILES", "STEP"), help=argparse.SUPPRESS)
+    parser.add_argument("--traced", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        # Child process started by `run_step`, which reads the measure from the output
+        input_file_path = Path(__file__).parent / "input.txt"
+        input_data = input_file_path.read_text().splitlines()
+        measure_tiles, measure_step_name = int(args.measure[0]), args.measure[1]
+        if measure_step_name not in STEPS:
+            raise ValueError(f"Unknown step ‘{measure_step_name}’")
+        print(json.dumps(measure_step(input_data, measure_tiles, measure_step_name, args.traced)))
+        sys.exit()
+
+    results = run_benchmark(args.tiles, args.engines, args.timeout, args.traced_max_tiles)
+
+    report = {
+        "commit": get_commit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"Results written to {args.output}")
@@ -1,37 +1,136 @@
 #!/usr/bin/env python3
 
+import heapq
+import random
 import time
-from collections import defaultdict
-from dataclasses import dataclass
-from operator import attrgetter
+from array import array
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import NamedTuple
+
+try:
+    import numpy as np
+except ImportError:  # Only required by the "numpy" engine
+    np = None
+
+UNKNOWN_SCORE = 2**63 - 1
+NO_PARENT = -1
+SHORTEST_PATH_TREES_CACHE_SIZE = 16
+
+
+@dataclass(slots=True)
+class Grid:
+    """
+    Risk levels stored row after row in a flat array of bytes.
+    Positions are referred to by their index in that array (`y * width + x`),
+    and their neighbors are computed from it rather than being linked to each other.
+    """
+
+    values: array
+    width: int
+
+    @classmethod
+    def from_data(cls, data):
+        return cls(array("B", (int(point) for line in data for point in line)), len(data[0]))
+
+    @property
+    def height(self):
+        return len(self) // self.width
+
+    def __getitem__(self, idx):
+        return self.values[idx]
+
+    def __len__(self):
+        return len(self.values)
+
+    def get_neighbors(self, idx):
+        y, x = divmod(idx, self.width)
+        if x < self.width - 1:
+            yield idx + 1  # Right
+        if y < self.height - 1:
+            yield idx + self.width  # Below
+        if x > 0:
+            yield idx - 1  # Left
+        if y > 0:
+            yield idx - self.width  # Above
+
+
+@dataclass(slots=True)
+class TiledGrid:
+    """
+    A grid repeated `tiles` times in both directions, without materialising the repetitions.
+    Each tile to the right or below increases the risk levels of the original by 1, wrapping back to 1 after 9.
+    """
+
+    tile: Grid
+    tiles: int
+    # Computed once, since they are used for every lookup
+    width: int = field(init=False)
+    height: int = field(init=False)
+
+    def __post_init__(self):
+        self.width = self.tile.width * self.tiles
+        self.height = self.tile.height * self.tiles
+
+    def __getitem__(self, idx):
+        y, x = divmod(idx, self.width)
+        tile_y, tile_row = divmod(y, self.tile.height)
+        tile_x, tile_column = divmod(x, self.tile.width)
+        value = self.tile.values[tile_row * self.tile.width + tile_column] + tile_x + tile_y
+        return (value - 1) % 9 + 1
+
+    def __len__(self):
+        return len(self.tile) * self.tiles * self.tiles
+
+    def to_grid(self):
+        """Materialise the repetitions, translating each row of the tile once per increase."""
+        tile = self.tile
+        rows = [tile.values[y * tile.width : (y + 1) * tile.width].tobytes() for y in range(tile.height)]
+        increases = [
+            bytes((value + increase - 1) % 9 + 1 for value in range(256)) for increase in range(2 * self.tiles)
+        ]
+
+        values = array("B")
+        for tile_y in range(self.tiles):
+            for row in rows:
+                for tile_x in range(self.tiles):
+                    values.frombytes(row.translate(increases[tile_x + tile_y]))
+
+        return Grid(values, self.width)
+
+    # Neighbors only depend on the width and height
+    get_neighbors = Grid.get_neighbors
 
 
-@dataclass(slots=True, eq=False, repr=False)
-class Node:
-    value: int
-    x: int
-    y: int
-    above: Optional["Node"] = None
-    below: Optional["Node"] = None
-    left: Optional["Node"] = None
-    right: Optional["Node"] = None
+class MapKey(NamedTuple):
+    """
+    The content of a map, hashable so that it can key caches. Build it once (with `get_map_key`)
+    and reuse it for repeated queries, rather than rebuilding and hashing the map every time.
+    """
 
-    def get_neighbors(self):
-        yield from filter(None, [self.right, self.below, self.left, self.above])
+    values: bytes
+    width: int
+    tiles: int
 
-    def __str__(self):
-        return f"{self.value} ({self.x}, {self.y})"
 
-    def __repr__(self):
-        return f"{self.__class__.__name__}(value={self.value}, x={self.x}, y={self.y}, ...)"
+@dataclass(slots=True)
+class ShortestPathTree:
+    """
+    The lowest risk levels from one start position to every position of a grid,
+    along with the position preceding each of them on the matching path.
+    Both are read-only views, since the same tree is shared by every caller of the cache.
+    """
 
-    def __eq__(self, other):
-        return self.x == other.x and self.y == other.y
+    start: int
+    lowest_risks: memoryview
+    came_from: memoryview
 
-    def __hash__(self):
-        return hash((self.x, self.y))
+    def get_risk_level(self, goal):
+        return self.lowest_risks[goal]
+
+    def reconstruct_path(self, goal):
+        return reconstruct_path(self.came_from, goal)
 
 
 def multiply(data, by=5):
@@ -41,6 +140,7 @@ def multiply(data, by=5):
     # 3 4 5 6 7
     # 4 5 6 7 8
     # 5 6 7 8 9
+    # Past that (`by > 5`), risks wrap back to the original ones every 9 copies.
     unfolded_copies = [
         [
             [v if (v := int(value) + copy_idx) <= 9 else v - 9 for value in row]
@@ -56,8 +156,8 @@ def multiply(data, by=5):
         [
             unfolded_copies[
                 # Finds the correct copy to use
-                x // original_width_and_height
-                + y // original_width_and_height
+                (x // original_width_and_height + y // original_width_and_height)
+                % 9
             ][
                 # Finds the correct row to use
                 y
@@ -73,109 +173,257 @@ def multiply(data, by=5):
     ]
 
 
-def get_nodes(data):
-    nodes = []
-
-    above = [None] * len(data[0])
-    for height, line in enumerate(data):
-        left = None
-        for width, point in enumerate(line):
-            node = Node(
-                value=int(point),
-                x=width,
-                y=height,
-                above=above[width],
-                left=left,
-            )
-
-            if left:
-                left.right = node
-            if above[width]:
-                above[width].below = node
+def print_grid(grid, path=None):
+    path = set(path or [])
 
-            left = node
-            above[width] = node
-
-            nodes.append(node)
-
-    return nodes
-
-
-def print_grid(nodes, path=None):
-    if path is None:
-        path = []
-
-    for idx, node in enumerate(nodes, start=1):
-        if node.x == 0 and idx != 0:
+    for idx in range(len(grid)):
+        if idx % grid.width == 0:
             print()
 
-        value = (
-            f"\033[93m{node.value}\033[0m"
-            if node in path
-            else f"\033[94m{node.value}\033[0m"
-        )
+        value = f"\033[93m{grid[idx]}\033[0m" if idx in path else f"\033[94m{grid[idx]}\033[0m"
         print(value, end="")
     print()
 
 
-def find_safer_path(start, goal, heuristic):
-    # The set of discovered nodes that may need to be (re-)expanded.
-    to_visit = {start}
+def find_safer_path(grid, start, goal, heuristic, stats=None):
+    # The discovered positions that may need to be (re-)expanded, as a heap of `(f_score, position)`.
+    # Positions are never removed from the heap when their score improves, instead the outdated entries
+    # are skipped when popped (their f_score no longer matches the best known one).
+    to_visit = [(heuristic(start), start)]
 
-    # For node n, cameFrom[n] is the node immediately preceding it on the cheapest path
+    # For position n, came_from[n] is the position immediately preceding it on the cheapest path
     # from start to n currently known.
-    came_from = {}
+    came_from = array("q", [NO_PARENT]) * len(grid)
 
-    # For node n, g_score[n] is the cost of the cheapest path from start to n currently known.
-    g_score = defaultdict(lambda: float("inf"))
+    # For position n, g_score[n] is the cost of the cheapest path from start to n currently known.
+    g_score = array("q", [UNKNOWN_SCORE]) * len(grid)
     g_score[start] = 0
 
-    # For node n, f_score[n] := g_score[n] + h(n). f_score[n] represents our current best guess as to
+    # For position n, f_score[n] := g_score[n] + h(n). f_score[n] represents our current best guess as to
     # how short a path from start to finish can be if it goes through n.
-    f_score = defaultdict(lambda: float("inf"))
+    f_score = array("q", [UNKNOWN_SCORE]) * len(grid)
     f_score[start] = heuristic(start)
 
     while to_visit:
-        # Get the node with the lowest f_score
-        current = sorted(to_visit, key=f_score.__getitem__)[0]
+        # Get the position with the lowest f_score
+        current_f_score, current = heapq.heappop(to_visit)
+        if current_f_score > f_score[current]:  # Stale entry, the position was re-queued with a better score
+            continue
+
+        if stats is not None:
+            stats["expanded"] += 1
 
         # Reached the end
         if current == goal:
             return reconstruct_path(came_from, current)
 
-        to_visit.remove(current)
-        for neighbor in current.get_neighbors():
-            tentative_g_score = g_score[current] + neighbor.value
+        for neighbor in grid.get_neighbors(current):
+            tentative_g_score = g_score[current] + grid[neighbor]
             if tentative_g_score < g_score[neighbor]:
                 came_from[neighbor] = current
                 g_score[neighbor] = tentative_g_score
                 f_score[neighbor] = tentative_g_score + heuristic(neighbor)
-                to_visit.add(neighbor)
+                heapq.heappush(to_visit, (f_score[neighbor], neighbor))
+
+
+def find_safer_path_with_buckets(grid, start, goal, max_risk=9, stats=None):
+    _, came_from = find_lowest_risks_with_buckets(grid, start, goal, max_risk, stats)
+    return reconstruct_path(came_from, goal)
+
+
+def find_lowest_risks_with_buckets(grid, start, goal=None, max_risk=9, stats=None):
+    # Dial's algorithm: Dijkstra with a bucket queue, only possible because risks are small integers.
+    # Positions waiting to be expanded never have a score more than `max_risk` higher than the current one,
+    # so a circular list of `max_risk + 1` buckets, indexed by `score % (max_risk + 1)`,
+    # is enough to always get the positions with the lowest score.
+    buckets = [[] for _ in range(max_risk + 1)]
+    buckets[0].append(start)
+    pending_count = 1
+
+    came_from = array("q", [NO_PARENT]) * len(grid)
+
+    g_score = array("q", [UNKNOWN_SCORE]) * len(grid)
+    g_score[start] = 0
+
+    current_score = 0
+    while pending_count:
+        bucket = buckets[current_score % len(buckets)]
+        while bucket:
+            current = bucket.pop()
+            pending_count -= 1
+            if g_score[current] != current_score:  # Stale entry, the position was re-queued with a better score
+                continue
+
+            if stats is not None:
+                stats["expanded"] += 1
+
+            # Reached the end, when there is one (otherwise every position gets expanded)
+            if current == goal:
+                return g_score, came_from
+
+            for neighbor in grid.get_neighbors(current):
+                tentative_g_score = current_score + grid[neighbor]
+                if tentative_g_score < g_score[neighbor]:
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g_score
+                    buckets[tentative_g_score % len(buckets)].append(neighbor)
+                    pending_count += 1
+
+        current_score += 1
+
+    return g_score, came_from
+
+
+def get_risks_array(grid):
+    if isinstance(grid, TiledGrid):
+        tile = get_risks_array(grid.tile)
+        # Each tile adds its distance (in tiles) from the top left one to the original risk levels
+        tiles_increase = np.add.outer(np.arange(grid.tiles), np.arange(grid.tiles))
+        increase = np.kron(tiles_increase, np.ones(tile.shape, dtype=np.int64))
+        return (np.tile(tile, (grid.tiles, grid.tiles)) + increase - 1) % 9 + 1
+
+    return np.frombuffer(grid.values, dtype=np.uint8).reshape(grid.height, grid.width).astype(np.int64)
+
+
+def find_lowest_risks_with_numpy(risks, start, stats=None):
+    # Each pass is only a few array operations, but passes are repeated until nothing improves, which takes
+    # about as many passes as the safest paths wind back and forth (~200 on the 500x500 map, growing with its side).
+    # On these maps, this ends up slower than Dial's algorithm.
+    # No path costs more than the sum of all risks, so it stands for "not reached yet"
+    # while keeping the arithmetic below within int64 (unlike `UNKNOWN_SCORE`).
+    lowest_risks = np.full(risks.shape, risks.sum() + 1, dtype=np.int64)
+    lowest_risks[start] = 0
+
+    # Sum of the risks entered when going from the left (top) edge up to and including each position.
+    # Going right from `a` to `b` on a row costs `row_sums[b] - row_sums[a]`,
+    # going left from `b` to `a` costs `row_sums[b - 1] - row_sums[a - 1]` (the sums excluding each position).
+    row_sums = risks.cumsum(axis=1)
+    row_sums_excluded = row_sums - risks
+    column_sums = risks.cumsum(axis=0)
+    column_sums_excluded = column_sums - risks
+
+    while True:
+        previous_lowest_risks = lowest_risks
+        if stats is not None:  # Every position is relaxed again on each pass
+            stats["expanded"] += risks.size
+
+        # Rightward then leftward sweeps, using a cumulative minimum over each row
+        lowest_risks = np.minimum.accumulate(lowest_risks - row_sums, axis=1) + row_sums
+        lowest_risks = (
+            np.minimum.accumulate((lowest_risks + row_sums_excluded)[:, ::-1], axis=1)[:, ::-1] - row_sums_excluded
+        )
+        # Downward then upward sweeps, the same way over each column
+        lowest_risks = np.minimum.accumulate(lowest_risks - column_sums, axis=0) + column_sums
+        lowest_risks = (
+            np.minimum.accumulate((lowest_risks + column_sums_excluded)[::-1, :], axis=0)[::-1, :]
+            - column_sums_excluded
+        )
+
+        if np.array_equal(lowest_risks, previous_lowest_risks):
+            return lowest_risks
+
+
+def find_safer_path_with_numpy(grid, start, goal, stats=None):
+    risks = get_risks_array(grid)
+    lowest_risks = find_lowest_risks_with_numpy(risks, divmod(start, grid.width), stats).ravel()
+    risks = risks.ravel()
+
+    # Walk back from the goal, always through a neighbor from which entering the current position gives its risk
+    path = [goal]
+    current = goal
+    while current != start:
+        current = next(
+            neighbor
+            for neighbor in grid.get_neighbors(current)
+            if lowest_risks[neighbor] + risks[current] == lowest_risks[current]
+        )
+        path.append(current)
+
+    return list(reversed(path))
+
+
+def get_distance_heuristic(grid, goal):
+    # Entering a position costs at least 1, so the Manhattan distance to the goal never overestimates
+    # the remaining risk (which A* needs to only ever return the cheapest paths)
+    goal_y, goal_x = divmod(goal, grid.width)
+
+    def estimate_cost_to_goal(idx):
+        y, x = divmod(idx, grid.width)
+        return abs(goal_x - x) + abs(goal_y - y)
+
+    return estimate_cost_to_goal
 
 
 def reconstruct_path(came_from, current):
     path = [current]
 
-    while current := came_from.get(current):
+    while (current := came_from[current]) != NO_PARENT:
         path.append(current)
 
     return list(reversed(path))
 
 
-def get_lower_risk_level(data, show_grid=True):
-    start, *_, goal = grid = get_nodes(data)
+def get_grid(data, tiles=1):
+    grid = Grid.from_data(data)
+    if tiles > 1:
+        grid = TiledGrid(grid, tiles)
+
+    return grid
+
+
+def get_lower_risk_level(data, show_grid=True, engine="astar", tiles=1):
+    grid = get_grid(data, tiles)
+    return get_grid_lower_risk_level(grid, show_grid, engine)
 
-    estimated_cost_to_goal = attrgetter("value")
 
-    path = find_safer_path(start, goal, estimated_cost_to_goal)
+def get_grid_lower_risk_level(grid, show_grid=True, engine="astar", stats=None):
+    start, goal = 0, len(grid) - 1
+
+    match engine:
+        case "astar":
+            # A* looks up risk levels for every neighbor, which costs more on a tiled grid than materialising it
+            # (a byte per position, next to the 24 bytes of the search's own arrays)
+            if isinstance(grid, TiledGrid):
+                grid = grid.to_grid()
+            estimated_cost_to_goal = get_distance_heuristic(grid, goal)
+            path = find_safer_path(grid, start, goal, estimated_cost_to_goal, stats=stats)
+        case "dial":
+            path = find_safer_path_with_buckets(grid, start, goal, stats=stats)
+        case "numpy":
+            path = find_safer_path_with_numpy(grid, start, goal, stats=stats)
+        case _:
+            raise ValueError(f"Unknown engine ‘{engine}’")
 
     if show_grid:
         print_grid(grid, path)
 
-    risk_level = sum(map(attrgetter("value"), path)) - start.value
+    risk_level = sum(map(grid.__getitem__, path)) - grid[start]
     return risk_level
 
 
+def get_map_key(data, tiles=1):
+    grid = Grid.from_data(data)
+    return MapKey(grid.values.tobytes(), grid.width, tiles)
+
+
+def get_shortest_path_tree(data, start=0, tiles=1):
+    # Given a `MapKey`, a cached tree is found without going through the whole map again
+    # (`bytes` only compute their hash once)
+    map_key = data if isinstance(data, MapKey) else get_map_key(data, tiles)
+    return _get_shortest_path_tree(map_key, start)
+
+
+@lru_cache(maxsize=SHORTEST_PATH_TREES_CACHE_SIZE)
+def _get_shortest_path_tree(map_key, start):
+    # Keyed on the content of the map (rather than the data list, which can't be hashed)
+    grid = Grid(array("B", map_key.values), map_key.width)
+    if map_key.tiles > 1:
+        grid = TiledGrid(grid, map_key.tiles)
+
+    lowest_risks, came_from = find_lowest_risks_with_buckets(grid, start)
+    return ShortestPathTree(start, memoryview(lowest_risks).toreadonly(), memoryview(came_from).toreadonly())
+
+
 if __name__ == "__main__":
     example_data = [
         "1163751742",
@@ -191,6 +439,40 @@ if __name__ == "__main__":
     ]
     assert get_lower_risk_level(example_data) == 40
     assert get_lower_risk_level(multiply(example_data, 5)) == 315
+    assert get_lower_risk_level(example_data, show_grid=False, engine="dial") == 40
+    assert get_lower_risk_level(multiply(example_data, 5), show_grid=False, engine="dial") == 315
+    tiled_grid = TiledGrid(Grid.from_data(example_data), 5)
+    assert list(map(tiled_grid.__getitem__, range(len(tiled_grid)))) == list(
+        Grid.from_data(multiply(example_data, 5)).values
+    )
+    assert get_lower_risk_level(example_data, show_grid=False, tiles=5) == 315
+    assert tiled_grid.to_grid() == Grid.from_data(multiply(example_data, 5))
+    tiled_grid = TiledGrid(Grid.from_data(example_data), 12)
+    assert list(map(tiled_grid.__getitem__, range(len(tiled_grid)))) == list(
+        Grid.from_data(multiply(example_data, 12)).values
+    )
+    assert get_lower_risk_level(example_data, show_grid=False, engine="dial", tiles=5) == 315
+    if np is not None:
+        assert get_lower_risk_level(example_data, show_grid=False, engine="numpy") == 40
+        assert get_lower_risk_level(example_data, show_grid=False, engine="numpy", tiles=5) == 315
+
+    tree = get_shortest_path_tree(example_data)
+    assert tree.get_risk_level(99) == 40
+    assert tree.get_risk_level(12) == 12
+    assert tree.reconstruct_path(0) == [0]
+    assert tree.reconstruct_path(12) in ([0, 1, 11, 12], [0, 10, 11, 12])  # Both cost 12
+    assert get_shortest_path_tree(example_data) is tree
+    assert get_shortest_path_tree(example_data, tiles=5).get_risk_level(2499) == 315
+    map_key = get_map_key(example_data, tiles=5)
+    assert get_shortest_path_tree(map_key) is get_shortest_path_tree(example_data, tiles=5)
+    # Going backward, the risk of the goal (9) is no longer entered, but the one of the start (1) is
+    assert get_shortest_path_tree(map_key, start=2499).get_risk_level(0) == 315 - 9 + 1
+    try:
+        tree.came_from[12] = 0
+    except TypeError:
+        pass
+    else:
+        assert False, "Shortest path trees should be read-only"
 
     example_data = [
         "19999",
@@ -198,6 +480,36 @@ if __name__ == "__main__":
         "11191",
     ]
     assert get_lower_risk_level(example_data) == 8
+    assert get_lower_risk_level(example_data, show_grid=False, engine="dial") == 8
+    if np is not None:
+        assert get_lower_risk_level(example_data, show_grid=False, engine="numpy") == 8
+
+    # Maps where a heuristic overestimating the remaining risk made A* miss the cheapest path
+    example_data = [
+        "712498943",
+        "578981738",
+        "192482925",
+        "992713793",
+        "637179113",
+        "265188697",
+        "396481119",
+        "921127197",
+        "167632892",
+    ]
+    assert get_lower_risk_level(example_data, show_grid=False) == 55
+    example_data = ["4685735", "6167849", "9367544", "2699329", "9459944", "7338149", "3434216"]
+    assert get_lower_risk_level(example_data, show_grid=False, tiles=3) == get_lower_risk_level(
+        example_data, show_grid=False, engine="dial", tiles=3
+    )
+
+    rng = random.Random(15)
+    for _ in range(300):
+        size = rng.randint(2, 12)
+        example_data = ["".join(rng.choice("123456789") for _ in range(size)) for _ in range(size)]
+        tiles = rng.randint(1, 3)
+        assert get_lower_risk_level(example_data, show_grid=False, tiles=tiles) == get_lower_risk_level(
+            example_data, show_grid=False, engine="dial", tiles=tiles
+        ), example_data
 
     input_file_path = Path(__file__).parent / "input.txt"
     input_data = input_file_path.read_text().splitlines()
@@ -205,13 +517,15 @@ if __name__ == "__main__":
     normal_size_result = get_lower_risk_level(input_data)
     print(f"{normal_size_result=}")
 
-    start_time = time.monotonic()
-    large_input_data = multiply(input_data, 5)
-    expand_time = time.monotonic()
-    large_size_result = get_lower_risk_level(large_input_data, show_grid=False)
-    result_time = time.monotonic()
-    print(
-        f"{large_size_result=} "
-        f"(expand={expand_time-start_time:.2f}s, "
-        f"path={result_time-expand_time:.2f}s)"
-    )
+    for engine in ("astar", "dial", "numpy") if np is not None else ("astar", "dial"):
+        start_time = time.monotonic()
+        large_grid = get_grid(input_data, tiles=5)
+        expand_time = time.monotonic()
+        large_size_result = get_grid_lower_risk_level(large_grid, show_grid=False, engine=engine)
+        result_time = time.monotonic()
+        print(
+            f"{large_size_result=} "
+            f"({engine=}, "
+            f"expand={expand_time-start_time:.2f}s, "
+            f"path={result_time-expand_time:.2f}s)"
+        )
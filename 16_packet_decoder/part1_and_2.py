@@ -1,9 +1,18 @@
 #!/usr/bin/env python3
 
-from functools import partial
-from itertools import chain
+import io
+import mmap
+import os
+import re
+import tracemalloc
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from itertools import islice
 from math import prod
-from operator import attrgetter, eq, gt, lt
+from operator import add, eq, gt, lt, mul
 from pathlib import Path
 from typing import NamedTuple
 
@@ -15,6 +24,11 @@ SUB_PACKET_LENGTH = 15
 SUB_PACKET_CHILDREN_COUNT_LENGTH = 11
 
 MIN_PACKET_SIZE = PACKET_VERSION_LENGTH + PACKET_TYPE_LENGTH + PACKET_DIGIT_LENGTH
+MAX_COLUMN_VALUE = 2**64 - 1
+
+STREAM_CHUNK_SIZE = 64 * 1024  # Hex digits
+COMPILED_EXPRESSIONS_CACHE_SIZE = 1024
+BATCH_CHUNK_SIZE = 1000  # Transmissions sent to a worker at once
 
 PACKET_TYPE_LITERAL_NUMBER = 4
 PACKET_TYPE_TO_OPERATOR = {
@@ -26,6 +40,16 @@ PACKET_TYPE_TO_OPERATOR = {
     6: lambda values: int(lt(*values)),
     7: lambda values: int(eq(*values)),
 }
+# Same as `PACKET_TYPE_TO_OPERATOR`, but folding the values of the sub packets one at a time
+PACKET_TYPE_TO_REDUCER = {
+    0: add,
+    1: mul,
+    2: min,
+    3: max,
+    5: lambda left, right: int(gt(left, right)),
+    6: lambda left, right: int(lt(left, right)),
+    7: lambda left, right: int(eq(left, right)),
+}
 
 
 class Packet(NamedTuple):
@@ -34,8 +58,124 @@ class Packet(NamedTuple):
     payload: int | list["Packet"]
 
 
-flatten = chain.from_iterable
-bin_to_int = partial(int, base=2)
+@dataclass(slots=True)
+class PacketColumns:
+    """
+    Packets stored as parallel columns, each packet coming right before its sub packets (like in the transmission).
+    `values` holds the value of literal numbers and the sub packets count of operators (up to 64 bits,
+    larger literal numbers being kept in `large_values` by index instead, with 0 in `values`),
+    while `ends` holds the index following the last of the packet's (nested) sub packets.
+    """
+
+    versions: array = field(default_factory=partial(array, "B"))
+    type_ids: array = field(default_factory=partial(array, "B"))
+    values: array = field(default_factory=partial(array, "Q"))
+    ends: array = field(default_factory=partial(array, "Q"))
+    large_values: dict = field(default_factory=dict)
+
+    def get_value(self, idx):
+        return self.large_values.get(idx, self.values[idx])
+
+    def __len__(self):
+        return len(self.versions)
+
+
+class BitReader:
+    """
+    Read a transmission a few bits at a time, with shifts and masks over its bytes
+    (rather than going through a string of `0` and `1`).
+    """
+
+    def __init__(self, data, length=None):
+        self.data = data
+        self.length = len(data) * 8 if length is None else length
+        self.position = 0
+        # Position of the first bit of `data` in the transmission (only moves when data is streamed)
+        self.offset = 0
+
+    @classmethod
+    def from_hex(cls, hex_data):
+        # `bytes.fromhex` only accepts full bytes, so odd transmissions are padded (but not the length)
+        padding = "0" * (len(hex_data) % 2)
+        return cls(bytes.fromhex(hex_data + padding), len(hex_data) * 4)
+
+    def available(self, length):
+        return self.position + length <= self.length
+
+    def read(self, length):
+        if not self.available(length):
+            raise ValueError("Transmission ended unexpectedly")
+
+        # Only the bytes holding the requested bits are converted
+        start, end = self.position - self.offset, self.position - self.offset + length
+        chunk = int.from_bytes(self.data[start // 8 : (end + 7) // 8], "big")
+        self.position += length
+        return (chunk >> (-end % 8)) & ((1 << length) - 1)
+
+
+class StreamBitReader(BitReader):
+    """
+    Read transmissions from a file-like object of hex digits (text, bytes or memory-mapped file),
+    one chunk at a time. Transmissions are separated by whitespaces, and each of them starts on a fresh byte
+    (an odd number of digits being padded), so that the padding following the packet of one transmission
+    can be skipped. The bytes already read are dropped whenever a new chunk is loaded,
+    so memory only depends on the chunk size.
+    """
+
+    def __init__(self, file, chunk_size=STREAM_CHUNK_SIZE):
+        super().__init__(b"", 0)
+        self.file = file
+        self.chunk_size = chunk_size
+        self.is_exhausted = False
+        self._odd_digit = ""  # Left over from the previous chunk, until it can make a full byte
+        self._in_transmission = False
+        # Position of the end (padding excluded) of the transmissions loaded so far, until they are skipped
+        self._transmissions_ends = deque()
+
+    def available(self, length):
+        while not super().available(length) and not self.is_exhausted:
+            self._load_chunk()
+        return super().available(length)
+
+    def skip_transmission_padding(self):
+        """Move to the start of the next transmission, once the packet of the current one is read."""
+        while not self._transmissions_ends and not self.is_exhausted:
+            self._load_chunk()
+
+        end = self._transmissions_ends.popleft()
+        if self.position > end:
+            raise ValueError("Transmission ended unexpectedly")
+        self.position = (end + 7) // 8 * 8
+
+    def _load_chunk(self):
+        chunk = self.file.read(self.chunk_size)
+        if isinstance(chunk, bytes):
+            chunk = chunk.decode("ascii")
+        self.is_exhausted = not chunk
+
+        digits = [self._odd_digit]
+        digits_count = len(self._odd_digit)
+        # The end of the file ends the last transmission, like a whitespace
+        for match in re.finditer(r"\s+|\S+", chunk or " "):
+            if not match[0].isspace():
+                self._in_transmission = True
+                digits.append(match[0])
+                digits_count += len(match[0])
+            elif self._in_transmission:
+                self._in_transmission = False
+                self._transmissions_ends.append(self.length + digits_count * 4)
+                if digits_count % 2:  # So that the next transmission starts on a fresh byte
+                    digits.append("0")
+                    digits_count += 1
+
+        digits = "".join(digits)
+        full_bytes_length = digits_count - digits_count % 2
+        full_bytes_digits, self._odd_digit = digits[:full_bytes_length], digits[full_bytes_length:]
+
+        read_bytes_count = min((self.position - self.offset) // 8, len(self.data))
+        self.data = self.data[read_bytes_count:] + bytes.fromhex(full_bytes_digits)
+        self.offset += read_bytes_count * 8
+        self.length += full_bytes_length * 4
 
 
 def hex_to_bits(hex):
@@ -43,62 +183,177 @@ def hex_to_bits(hex):
     return f"{int(hex, 16):0{width}b}"
 
 
-def read(data, start, length):
-    end = start + length
-    chunk = data[start:end]
-    return chunk, end
+def parse(hex_data, compact=False):
+    reader = BitReader.from_hex(hex_data)
+    if compact:
+        return parse_bits_to_columns(reader, reader.length)
+    return parse_bits(reader, reader.length)
+
 
+def parse_bits(reader, end, max_packets=float("inf")):
+    packets = []
+
+    # Packets being decoded, from the outermost to the innermost one. Each of them holds its version and type,
+    # the sub packets decoded so far, the position of its end (or of its parent's end when it's only
+    # known by its number of sub packets), how many sub packets it can hold, and where to resume reading after it.
+    # Using a stack (rather than recursion) keeps deeply nested transmissions away from the recursion limit.
+    pending = [(None, None, packets, end, max_packets, None)]
+    while pending:
+        version, type_id, sub_packets, sub_packets_end, max_sub_packets, resume_at = pending[-1]
+
+        if (
+            (reader.position <= sub_packets_end - MIN_PACKET_SIZE)
+            and (len(sub_packets) < max_sub_packets)
+            and reader.available(MIN_PACKET_SIZE)
+        ):
+            version = reader.read(PACKET_VERSION_LENGTH)
+            type_id = reader.read(PACKET_TYPE_LENGTH)
+
+            if type_id == PACKET_TYPE_LITERAL_NUMBER:  # Literal number
+                sub_packets.append(Packet(version, type_id, read_literal_number(reader)))
+
+            elif reader.read(SUB_PACKET_TYPE_LENGTH) == 0:  # Operator, with sub packets length
+                sub_packet_length = reader.read(SUB_PACKET_LENGTH)
+                end = reader.position + sub_packet_length
+                pending.append((version, type_id, [], end, float("inf"), end))
+
+            else:  # Operator, with sub packets count
+                sub_packets_count = reader.read(SUB_PACKET_CHILDREN_COUNT_LENGTH)
+                pending.append((version, type_id, [], sub_packets_end, sub_packets_count, None))
+
+        else:  # The innermost packet is complete
+            pending.pop()
+            if resume_at is not None:
+                reader.position = resume_at
+            if pending:
+                pending[-1][2].append(Packet(version, type_id, sub_packets))
 
-def parse(hex_data):
-    bits = hex_to_bits(hex_data)
-    packets, _ = parse_bin(bits)
     return packets
 
 
-def parse_bin(bits, max_packets=float("inf")):
-    read_bits = partial(read, bits)
-    packets = []
-    pointer = 0
-    end = len(bits)
-    while (pointer <= end - MIN_PACKET_SIZE) and (len(packets) < max_packets):
-        version, pointer = read_bits(pointer, PACKET_VERSION_LENGTH)
-        type_id, pointer = read_bits(pointer, PACKET_TYPE_LENGTH)
-        version, type_id = bin_to_int(version), bin_to_int(type_id)
-
-        if type_id == PACKET_TYPE_LITERAL_NUMBER:  # Literal number
-            parts = []
-            while True:
-                raw, pointer = read_bits(pointer, PACKET_DIGIT_LENGTH)
-                is_last = raw[0] == "0"
-                parts.append(raw[1:])
-                if is_last:
-                    break
-            value = bin_to_int("".join(parts))
-
-        else:  # Operator
-            sub_packet_type, pointer = read_bits(pointer, SUB_PACKET_TYPE_LENGTH)
-
-            if sub_packet_type == "0":
-                raw, pointer = read_bits(pointer, SUB_PACKET_LENGTH)
-                sub_packet_length = bin_to_int(raw)
-                raw, pointer = read_bits(pointer, sub_packet_length)
-                value, _ = parse_bin(raw)
-
-            elif sub_packet_type == "1":
-                raw, pointer = read_bits(pointer, SUB_PACKET_CHILDREN_COUNT_LENGTH)
-                sub_packets_count = bin_to_int(raw)
-                value, remainder = parse_bin(
-                    bits[pointer:], max_packets=sub_packets_count
-                )
-                pointer = end - len(remainder)
-
-            else:
-                raise ValueError("Unknown sub packet type")
-
-        packet = Packet(version, type_id, value)
-        packets.append(packet)
-
-    return packets, bits[pointer:]
+def parse_bits_to_columns(reader, end, max_packets=float("inf")):
+    columns = PacketColumns()
+
+    # Same as `parse_bits`, except that operators are referred to by their index in the columns
+    # and that only the count of their sub packets is kept (in a separate stack).
+    pending = [(None, end, max_packets, None)]
+    sub_packets_counts = [0]
+    while pending:
+        idx, sub_packets_end, max_sub_packets, resume_at = pending[-1]
+
+        if (
+            (reader.position <= sub_packets_end - MIN_PACKET_SIZE)
+            and (sub_packets_counts[-1] < max_sub_packets)
+            and reader.available(MIN_PACKET_SIZE)
+        ):
+            sub_packets_counts[-1] += 1
+            columns.versions.append(reader.read(PACKET_VERSION_LENGTH))
+            columns.type_ids.append(type_id := reader.read(PACKET_TYPE_LENGTH))
+
+            if type_id == PACKET_TYPE_LITERAL_NUMBER:  # Literal number
+                value = read_literal_number(reader)
+                if value > MAX_COLUMN_VALUE:
+                    columns.large_values[len(columns) - 1] = value
+                    value = 0
+                columns.values.append(value)
+                columns.ends.append(len(columns))
+                continue
+
+            # Operator, its count and end are filled in once complete
+            columns.values.append(0)
+            columns.ends.append(0)
+            sub_packets_counts.append(0)
+            if reader.read(SUB_PACKET_TYPE_LENGTH) == 0:  # With sub packets length
+                sub_packet_length = reader.read(SUB_PACKET_LENGTH)
+                end = reader.position + sub_packet_length
+                pending.append((len(columns) - 1, end, float("inf"), end))
+
+            else:  # With sub packets count
+                max_count = reader.read(SUB_PACKET_CHILDREN_COUNT_LENGTH)
+                pending.append((len(columns) - 1, sub_packets_end, max_count, None))
+
+        else:  # The innermost packet is complete
+            pending.pop()
+            sub_packets_count = sub_packets_counts.pop()
+            if resume_at is not None:
+                reader.position = resume_at
+            if idx is not None:
+                columns.values[idx] = sub_packets_count
+                columns.ends[idx] = len(columns)
+
+    return columns
+
+
+def iter_packets(file, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield the outermost packet of each transmission read from a file-like object, as soon as each is decoded.
+    Memory depends on the size of each packet rather than on the size of the whole file.
+    """
+    reader = StreamBitReader(file, chunk_size)
+    while reader.available(MIN_PACKET_SIZE):
+        yield from parse_bits(reader, float("inf"), max_packets=1)
+        reader.skip_transmission_padding()
+
+
+def evaluate_bits(reader, end, max_packets=float("inf")):
+    values = []
+
+    # Same as `parse_bits`, except that operators only keep the value of their sub packets folded so far
+    # (along with their count) rather than the sub packets themselves, so memory depends on how deeply
+    # packets are nested rather than on their size. The outermost level collects the values of the packets.
+    pending = [[None, values, 0, end, max_packets, None]]
+    while pending:
+        type_id, value, sub_packets_count, sub_packets_end, max_sub_packets, resume_at = pending[-1]
+
+        if (
+            (reader.position <= sub_packets_end - MIN_PACKET_SIZE)
+            and (sub_packets_count < max_sub_packets)
+            and reader.available(MIN_PACKET_SIZE)
+        ):
+            reader.read(PACKET_VERSION_LENGTH)
+            type_id = reader.read(PACKET_TYPE_LENGTH)
+
+            if type_id == PACKET_TYPE_LITERAL_NUMBER:  # Literal number
+                _fold_value(pending[-1], read_literal_number(reader))
+
+            elif reader.read(SUB_PACKET_TYPE_LENGTH) == 0:  # Operator, with sub packets length
+                sub_packet_length = reader.read(SUB_PACKET_LENGTH)
+                end = reader.position + sub_packet_length
+                pending.append([type_id, None, 0, end, float("inf"), end])
+
+            else:  # Operator, with sub packets count
+                max_count = reader.read(SUB_PACKET_CHILDREN_COUNT_LENGTH)
+                pending.append([type_id, None, 0, sub_packets_end, max_count, None])
+
+        else:  # The innermost packet is complete
+            pending.pop()
+            if resume_at is not None:
+                reader.position = resume_at
+            if pending:
+                # Operators without sub packets get the same value as when evaluating a whole list
+                _fold_value(pending[-1], value if sub_packets_count else PACKET_TYPE_TO_OPERATOR[type_id]([]))
+
+    return values
+
+
+def _fold_value(pending_packet, value):
+    type_id, folded_value, sub_packets_count, *_ = pending_packet
+    if type_id is None:  # Outermost level
+        folded_value.append(value)
+    else:
+        pending_packet[1] = PACKET_TYPE_TO_REDUCER[type_id](folded_value, value) if sub_packets_count else value
+    pending_packet[2] += 1
+
+
+def read_literal_number(reader):
+    value = 0
+    while True:
+        raw = reader.read(PACKET_DIGIT_LENGTH)
+        # The first bit tells whether more groups follow, the other ones are part of the number
+        has_more, digit = divmod(raw, 1 << (PACKET_DIGIT_LENGTH - 1))
+        value = (value << (PACKET_DIGIT_LENGTH - 1)) | digit
+        if not has_more:
+            return value
 
 
 def get_versions_sum(data):
@@ -107,41 +362,129 @@ def get_versions_sum(data):
 
 
 def _get_versions_sum(packets):
-    top_level_versions = sum(map(attrgetter("version"), packets))
-
-    nested_packets = list(
-        flatten(
-            map(
-                attrgetter("payload"),
-                filter(
-                    lambda packet: packet.type_id != PACKET_TYPE_LITERAL_NUMBER,
-                    packets,
-                ),
-            )
-        )
-    )
-    nested_level_versions_sum = (
-        _get_versions_sum(nested_packets) if nested_packets else 0
-    )
+    versions_sum = 0
+
+    to_visit = list(packets)
+    while to_visit:
+        packet = to_visit.pop()
+        versions_sum += packet.version
+        if packet.type_id != PACKET_TYPE_LITERAL_NUMBER:
+            to_visit.extend(packet.payload)
 
-    return top_level_versions + nested_level_versions_sum
+    return versions_sum
+
+
+def get_columns_versions_sum(columns):
+    return sum(columns.versions)
+
+
+def evaluate_columns(columns, idx=0):
+    # Scanning the packet and its sub packets backward means sub packets are always evaluated before
+    # the operator they belong to, with their values on top of the stack (first sub packet last).
+    values = []
+    for current in reversed(range(idx, columns.ends[idx])):
+        if columns.type_ids[current] == PACKET_TYPE_LITERAL_NUMBER:
+            values.append(columns.get_value(current))
+        else:
+            sub_values_start = len(values) - columns.values[current]
+            sub_values = values[sub_values_start:]
+            del values[sub_values_start:]
+            values.append(PACKET_TYPE_TO_OPERATOR[columns.type_ids[current]](sub_values[::-1]))
+
+    return values[0]
 
 
 def evaluate_expression(data):
+    instructions = compile_expression(data)
+    return run_instructions(instructions)
+
+
+@lru_cache(maxsize=COMPILED_EXPRESSIONS_CACHE_SIZE)
+def compile_expression(data):
     packets = parse(data)
     assert len(packets) == 1
-    return evaluate_sub_expression(packets[0])
+    return compile_packet(packets[0])
 
 
-def evaluate_sub_expression(packet):
-    values = [
-        sub_packet.payload
-        if sub_packet.type_id == PACKET_TYPE_LITERAL_NUMBER
-        else evaluate_sub_expression(sub_packet)
-        for sub_packet in packet.payload
-    ]
-    fn = PACKET_TYPE_TO_OPERATOR[packet.type_id]
-    return fn(values)
+def compile_packet(packet):
+    """
+    Flatten a packet tree into postfix instructions, which can be run over and over without walking the tree:
+    `(type_id, value)` for literal numbers, and `(type_id, sub_packets_count)` for operators
+    (which come right after their sub packets).
+    """
+    instructions = []
+
+    to_visit = [(packet, False)]
+    while to_visit:
+        packet, has_sub_packets_visited = to_visit.pop()
+        if packet.type_id == PACKET_TYPE_LITERAL_NUMBER:
+            instructions.append((packet.type_id, packet.payload))
+        elif has_sub_packets_visited:
+            instructions.append((packet.type_id, len(packet.payload)))
+        else:
+            to_visit.append((packet, True))
+            to_visit.extend((sub_packet, False) for sub_packet in reversed(packet.payload))
+
+    return tuple(instructions)
+
+
+def run_instructions(instructions):
+    values = []
+    for type_id, argument in instructions:
+        if type_id == PACKET_TYPE_LITERAL_NUMBER:
+            values.append(argument)
+        else:
+            # The values of the sub packets are the last ones computed
+            sub_values_start = len(values) - argument
+            value = PACKET_TYPE_TO_OPERATOR[type_id](values[sub_values_start:])
+            del values[sub_values_start:]
+            values.append(value)
+
+    assert len(values) == 1
+    return values[0]
+
+
+def iter_expressions_values(file, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield the value of the outermost packet of each transmission read from a file-like object.
+    Packets are evaluated while being decoded, so memory only depends on the chunk size and the nesting depth.
+    """
+    reader = StreamBitReader(file, chunk_size)
+    while reader.available(MIN_PACKET_SIZE):
+        yield from evaluate_bits(reader, float("inf"), max_packets=1)
+        reader.skip_transmission_padding()
+
+
+def get_versions_sums(transmissions, workers=None, chunk_size=BATCH_CHUNK_SIZE):
+    yield from map_in_process_pool(get_versions_sum, transmissions, workers, chunk_size)
+
+
+def evaluate_expressions(transmissions, workers=None, chunk_size=BATCH_CHUNK_SIZE):
+    yield from map_in_process_pool(evaluate_expression, transmissions, workers, chunk_size)
+
+
+def map_in_process_pool(fn, transmissions, workers=None, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Yield `fn(transmission)` for every transmission, in order, computing them by chunks across a process pool.
+    Only a couple of chunks per worker are queued at any time, so that `transmissions` is consumed lazily.
+    """
+    workers = workers or os.cpu_count()
+    transmissions = iter(transmissions)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        while True:
+            while len(pending) < workers * 2 and (chunk := list(islice(transmissions, chunk_size))):
+                pending.append(executor.submit(_map_chunk, fn, chunk))
+
+            if not pending:
+                break
+
+            yield from pending.popleft().result()
+
+
+def _map_chunk(fn, chunk):
+    return list(map(fn, chunk))
 
 
 if __name__ == "__main__":
@@ -155,6 +498,12 @@ if __name__ == "__main__":
         == "00111000000000000110111101000101001010010001001000000000"
     )
     assert parse(example_operator_packet) == [(1, 6, [(6, 4, 10), (2, 4, 20)])]
+    assert parse(example_operator_packet, compact=True) == PacketColumns(
+        versions=array("B", [1, 6, 2]),
+        type_ids=array("B", [6, 4, 4]),
+        values=array("Q", [2, 10, 20]),
+        ends=array("Q", [3, 2, 3]),
+    )
 
     example_operator_packet = "EE00D40C823060"
     assert (
@@ -170,13 +519,32 @@ if __name__ == "__main__":
     assert get_versions_sum("620080001611562C8802118E34") == 12
     assert get_versions_sum("C0015000016115A2E0802F182340") == 23
     assert get_versions_sum("A0016C880162017C3686B18A3D4780") == 31
+    example_transmissions = [
+        "8A004A801A8002F478",
+        "620080001611562C8802118E34",
+        "C0015000016115A2E0802F182340",
+        "A0016C880162017C3686B18A3D4780",
+    ]
+    assert list(get_versions_sums(example_transmissions, workers=2, chunk_size=1)) == [16, 12, 23, 31]
 
     input_file_path = Path(__file__).parent / "input.txt"
     input_data = input_file_path.read_text().splitlines()
 
     versions_sum = get_versions_sum(input_data[0])
     print(f"{versions_sum=}")
+    assert get_columns_versions_sum(parse(input_data[0], compact=True)) == versions_sum
+
+    example_file = io.StringIO("8A004A801A8002F478\nD2FE28  38006F45291200\n")
+    assert list(iter_packets(example_file, chunk_size=3)) == [
+        *parse("8A004A801A8002F478"),
+        *parse("D2FE28"),
+        *parse("38006F45291200"),
+    ]
+    assert list(iter_packets(io.BytesIO(b"D2FE28"), chunk_size=1)) == [(6, 4, 2021)]
+    with input_file_path.open("rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        assert _get_versions_sum(iter_packets(mapped_file, chunk_size=100)) == versions_sum
 
+    assert compile_expression("C200B40A82") == ((4, 1), (4, 2), (0, 2))
     assert evaluate_expression("C200B40A82") == 3
     assert evaluate_expression("04005AC33890") == 54
     assert evaluate_expression("880086C3E88112") == 7
@@ -185,6 +553,60 @@ if __name__ == "__main__":
     assert evaluate_expression("F600BC2D8F") == 0
     assert evaluate_expression("9C005AC2F8F0") == 0
     assert evaluate_expression("9C0141080250320F1802104A08") == 1
+    example_transmissions = ["C200B40A82", "04005AC33890", "880086C3E88112", "CE00C43D881120"] * 3
+    assert list(evaluate_expressions(example_transmissions, workers=2, chunk_size=5)) == [3, 54, 7, 9] * 3
+
+    # A sum of a literal number over 64 bits (2⁸⁰ - 1, in 20 groups of 4 bits) and 1
+    large_literal_number_bits = "000" "100" + "1" "1111" * 19 + "0" "1111"
+    large_sum_bits = "000" "000" "1" "00000000010" + large_literal_number_bits + "000" "100" "00001"
+    large_sum_bits += "0" * (-len(large_sum_bits) % 4)
+    large_sum_transmission = f"{int(large_sum_bits, 2):0{len(large_sum_bits) // 4}X}"
+    assert evaluate_expression(large_sum_transmission) == 2**80
+    large_sum_columns = parse(large_sum_transmission, compact=True)
+    assert large_sum_columns.large_values == {1: 2**80 - 1}
+    assert evaluate_columns(large_sum_columns) == 2**80
 
     expression_result = evaluate_expression(input_data[0])
     print(f"{expression_result=}")
+    assert evaluate_columns(parse(input_data[0], compact=True)) == expression_result
+
+    cache_hits = compile_expression.cache_info().hits
+    assert evaluate_expression(input_data[0]) == expression_result
+    assert compile_expression.cache_info().hits == cache_hits + 1
+
+    with input_file_path.open() as file:
+        assert list(iter_expressions_values(file, chunk_size=100)) == [expression_result]
+    assert list(iter_expressions_values(io.StringIO("C200B40A82 04005AC33890\n"), chunk_size=3)) == [3, 54]
+    # Each transmission starts on a fresh boundary, whatever the padding of the previous one
+    assert list(iter_expressions_values(io.StringIO("D2FE28\nD2FE28\n"), chunk_size=4)) == [2021, 2021]
+    assert list(iter_expressions_values(io.StringIO("D02 C200B40A82"), chunk_size=5)) == [1, 3]  # Odd digits count
+    try:
+        list(iter_expressions_values(io.StringIO("D2FE2 C200B40A82"), chunk_size=5))
+    except ValueError as error:
+        assert str(error) == "Transmission ended unexpectedly"
+    else:
+        assert False, "Truncated transmissions should be rejected"
+
+    # A sum of 20 sums (with a sub packets count) of 2,047 literal numbers, evaluated as it streams in
+    literal_number_bits = "000" "100" "00001"
+    inner_sum_bits = "000" "000" "1" f"{2047:011b}" + literal_number_bits * 2047
+    large_bits = "000" "000" "1" f"{20:011b}" + inner_sum_bits * 20
+    large_bits += "0" * (-len(large_bits) % 4)
+    large_transmission = f"{int(large_bits, 2):0{len(large_bits) // 4}X}"
+    large_file = io.StringIO(large_transmission)
+    tracemalloc.start()
+    assert list(iter_expressions_values(large_file, chunk_size=4096)) == [20 * 2047]
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak_memory < 100_000, f"{peak_memory=} for a {len(large_transmission):,} digits transmission"
+
+    # Sum packets (with a sub packets count) nested 10,000 levels deep around a literal number
+    depth = 10_000
+    nested_bits = "000" "000" "1" "00000000001"
+    literal_number_bits = "000" "100" "00111"
+    deep_bits = nested_bits * depth + literal_number_bits
+    deep_bits += "0" * (-len(deep_bits) % 4)
+    deep_transmission = f"{int(deep_bits, 2):0{len(deep_bits) // 4}X}"
+    assert get_versions_sum(deep_transmission) == 0
+    assert evaluate_expression(deep_transmission) == 7
+    assert evaluate_columns(parse(deep_transmission, compact=True)) == 7
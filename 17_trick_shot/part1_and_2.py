@@ -1,9 +1,18 @@
 #!/usr/bin/env python3
 
 import re
-from itertools import chain, count, product
+from collections import defaultdict
+from itertools import chain
+from math import isqrt
 from pathlib import Path
 
+try:
+    import numpy as np
+except ImportError:  # Only required by the "numpy" engine
+    np = None
+
+TRAJECTORY_STEPS_CHUNK_SIZE = 256
+
 flatten = chain.from_iterable
 
 
@@ -32,54 +41,188 @@ def trajectory(step, initial_x, initial_y):
     return x, y
 
 
-def get_highest_y_position(data):
+def get_position(velocity, step):
+    """
+    Position along an axis, ignoring that drag stops at 0 for `x`
+    (so only valid for `x` until the probe stops moving horizontally, at `step == velocity`).
+    """
+    return velocity * step - (step * (step - 1)) // 2
+
+
+def get_first_step_at_least(velocity, position):
+    """First step at which the position reaches `position` (which must be reachable), while still going up."""
+    # Smallest root of `step² - (2 * velocity + 1) * step + 2 * position = 0`, adjusted for rounding
+    discriminant = (2 * velocity + 1) ** 2 - 8 * position
+    step = max(0, (2 * velocity + 1 - isqrt(discriminant)) // 2)
+    while get_position(velocity, step) < position:
+        step += 1
+    while step > 0 and get_position(velocity, step - 1) >= position:
+        step -= 1
+    return step
+
+
+def get_first_step_at_most(velocity, position):
+    """First step at which the position is down to `position` (which must be negative), while going down."""
+    # Largest root of `step² - (2 * velocity + 1) * step + 2 * position = 0`, adjusted for rounding
+    discriminant = (2 * velocity + 1) ** 2 - 8 * position
+    step = (2 * velocity + 1 + isqrt(discriminant)) // 2
+    while get_position(velocity, step) > position:
+        step += 1
+    while step > 0 and get_position(velocity, step - 1) <= position:
+        step -= 1
+    return step
+
+
+def get_x_steps(initial_x, left, right):
+    """
+    First and last steps during which `x` is within the target (the last one being `None` if the probe stops there),
+    or `None` if it never is.
+    """
+    max_x = (initial_x * (initial_x + 1)) // 2  # Where it stops, due to drag
+    if max_x < left:
+        return None
+
+    first_step = get_first_step_at_least(initial_x, left)
+    if get_position(initial_x, first_step) > right:  # Jumped over the target
+        return None
+
+    last_step = None if max_x <= right else get_first_step_at_least(initial_x, right + 1) - 1
+    return first_step, last_step
+
+
+def get_y_steps(initial_y, bottom, top):
+    """First and last steps during which `y` is within the target, or `None` if it never is."""
+    first_step = get_first_step_at_most(initial_y, top)
+    last_step = get_first_step_at_most(initial_y, bottom - 1) - 1
+    return (first_step, last_step) if first_step <= last_step else None
+
+
+def find_valid_velocities(data):
+    """
+    Find every initial velocity ending up in the target, by intersecting the steps during which `x`
+    is in the target with the ones during which `y` is, for each initial `x` and `y`.
+    Assumes the target is to the right of and below the starting position, like in the puzzle.
+    """
     top, right, bottom, left = get_target_position(data)
 
-    min_initial_x, max_initial_x = 1, 100  # There's no point in shooting left to reach a target to the right
-    min_initial_y, max_initial_y = 1, 100  # There's no point in shooting down to reach the highest point
-    initial_velocity_candidates = product(range(min_initial_x, max_initial_x), range(min_initial_y, max_initial_y))
-
-    highest_ys = []
-    for initial_x, initial_y in initial_velocity_candidates:
-        ys = []
-        for step in count(1):
-            x, y = trajectory(step, initial_x, initial_y)
-
-            if x > right or y < bottom:  # Missed the target, no need to process further
-                ys = []  # Clear out recorded y positions
-                break
-
-            ys.append(y)
-
-            if left <= x <= right and top >= y >= bottom:  # In the target, no need to process further
-                break
+    # Shooting further right than the target overshoots it on the first step
+    bounded_initial_xs_by_step = defaultdict(list)
+    stopping_initial_xs = []  # The probe stops within the target from the first step onward
+    for initial_x in range(1, right + 1):
+        if (x_steps := get_x_steps(initial_x, left, right)) is None:
+            continue
+
+        first_step, last_step = x_steps
+        if last_step is None:
+            stopping_initial_xs.append((first_step, initial_x))
+        else:
+            for step in range(first_step, last_step + 1):
+                bounded_initial_xs_by_step[step].append(initial_x)
+
+    # Shooting lower than the target overshoots it on the first step, and shooting up with `initial_y`
+    # comes back to `y=0` with a velocity of `-initial_y - 1`, so from `-bottom` it overshoots on the next step
+    valid_velocities = set()
+    for initial_y in range(bottom, -bottom):
+        if (y_steps := get_y_steps(initial_y, bottom, top)) is None:
+            continue
+
+        first_step, last_step = y_steps
+        for step in range(first_step, last_step + 1):
+            valid_velocities.update((initial_x, initial_y) for initial_x in bounded_initial_xs_by_step.get(step, []))
+        valid_velocities.update(
+            (initial_x, initial_y) for stop_step, initial_x in stopping_initial_xs if stop_step <= last_step
+        )
+
+    return valid_velocities
+
+
+def get_trajectories(steps, initial_xs, initial_ys):
+    """Vectorised `trajectory`, with the arguments broadcast against each other"""
+    return get_x_positions(steps, initial_xs), get_y_positions(steps, initial_ys)
+
+
+def get_x_positions(steps, initial_xs):
+    # Drag stops once `x` velocity reaches 0, after `initial_x` steps
+    drag_steps = np.minimum(steps, initial_xs)
+    return initial_xs * drag_steps - (drag_steps * (drag_steps - 1)) // 2
+
+
+def get_y_positions(steps, initial_ys):
+    return initial_ys * steps - (steps * (steps - 1)) // 2
+
+
+def get_hits_steps(get_positions, initial_velocities, steps, low, high):
+    """
+    First and last steps during which the positions along an axis are within `low..high`, for each initial velocity
+    (with the first step after the last one as first, and 0 as last, when never), evaluating the positions
+    over a grid of velocities and a chunk of steps at a time, so that memory doesn't grow with the number of steps.
+    Relies on those steps being contiguous (see `find_valid_velocities`).
+    """
+    never = steps[-1] + 1
+    first_steps = np.full(len(initial_velocities), never)
+    last_steps = np.zeros(len(initial_velocities), dtype=steps.dtype)
+
+    for chunk_start in range(0, len(steps), TRAJECTORY_STEPS_CHUNK_SIZE):
+        chunk_steps = steps[chunk_start : chunk_start + TRAJECTORY_STEPS_CHUNK_SIZE]
+        positions = get_positions(chunk_steps[np.newaxis, :], initial_velocities[:, np.newaxis])
+        hits = (low <= positions) & (positions <= high)
+        has_hits = hits.any(axis=1)
+
+        # `argmax` gives the first hit of each row (and the last one over reversed rows)
+        is_first_hit = has_hits & (first_steps == never)
+        first_steps[is_first_hit] = chunk_steps[hits[is_first_hit].argmax(axis=1)]
+        last_steps[has_hits] = chunk_steps[len(chunk_steps) - 1 - hits[has_hits, ::-1].argmax(axis=1)]
+
+    return first_steps, last_steps
+
+
+def find_valid_velocities_with_numpy(data):
+    """
+    Find every initial velocity ending up in the target, by evaluating each axis over a grid of velocities and steps.
+    Since `x` only depends on the initial `x` and `y` on the initial `y`, the steps during which each axis
+    is within the target are found separately, then paired up for every velocity hitting the target on both axes.
+    Searches the same velocities as `find_valid_velocities`, with the same assumptions.
+    """
+    top, right, bottom, left = get_target_position(data)
+    initial_xs = np.arange(1, right + 1)
+    initial_ys = np.arange(bottom, -bottom)
+    # The highest shot (`initial_y == -bottom - 1`) goes under the target after `-2 * bottom` steps
+    steps = np.arange(1, -2 * bottom + 1)
 
-        if ys:
-            highest_ys.append(max(ys))
+    x_first_steps, x_last_steps = get_hits_steps(get_x_positions, initial_xs, steps, left, right)
+    y_first_steps, y_last_steps = get_hits_steps(get_y_positions, initial_ys, steps, bottom, top)
+    x_hit, y_hit = x_first_steps <= x_last_steps, y_first_steps <= y_last_steps
+    initial_xs, x_first_steps, x_last_steps = initial_xs[x_hit], x_first_steps[x_hit], x_last_steps[x_hit]
+    initial_ys, y_first_steps, y_last_steps = initial_ys[y_hit], y_first_steps[y_hit], y_last_steps[y_hit]
 
-    return max(highest_ys)
+    # A velocity is valid if both axes are in the target during (at least) one same step
+    hits = (x_first_steps[:, np.newaxis] <= y_last_steps[np.newaxis, :]) & (
+        y_first_steps[np.newaxis, :] <= x_last_steps[:, np.newaxis]
+    )
+    x_indexes, y_indexes = np.nonzero(hits)
+    return set(zip(initial_xs[x_indexes].tolist(), initial_ys[y_indexes].tolist()))
 
 
-def get_successful_shots_count(data):
-    top, right, bottom, left = get_target_position(data)
+def get_valid_velocities(data, engine):
+    match engine:
+        case "intervals":
+            return find_valid_velocities(data)
+        case "numpy":
+            return find_valid_velocities_with_numpy(data)
+        case _:
+            raise ValueError(f"Unknown engine ‘{engine}’")
 
-    min_initial_x, max_initial_x = 1, 100  # There's no point in shooting left to reach a target to the right
-    min_initial_y, max_initial_y = bottom, 100  # There's no point in shooting lower than the target
-    initial_velocity_candidates = product(range(min_initial_x, max_initial_x), range(min_initial_y, max_initial_y))
 
-    valid_velocities = []
-    for initial_x, initial_y in initial_velocity_candidates:
-        for step in count(1):
-            x, y = trajectory(step, initial_x, initial_y)
+def get_highest_y_position(data, engine="intervals"):
+    def get_highest_y(initial_y):
+        # Going up, it reaches its apex after `initial_y` steps, otherwise its highest point is after the first step
+        return (initial_y * (initial_y + 1)) // 2 if initial_y > 0 else initial_y
 
-            if x > right or y < bottom:  # Missed the target, no need to process further
-                break
+    return max(get_highest_y(initial_y) for _, initial_y in get_valid_velocities(data, engine))
 
-            if left <= x <= right and top >= y >= bottom:  # In the target, no need to process further
-                valid_velocities.append((initial_x, initial_y))
-                break
 
-    return len(valid_velocities)
+def get_successful_shots_count(data, engine="intervals"):
+    return len(get_valid_velocities(data, engine))
 
 
 if __name__ == "__main__":
@@ -99,6 +242,10 @@ if __name__ == "__main__":
     ]
     assert positions == expected_positions
 
+    if np is not None:
+        xs, ys = get_trajectories(np.arange(11), 6, 3)
+        assert list(zip(xs.tolist(), ys.tolist())) == expected_positions
+
     example_data = "target area: x=20..30, y=-10..-5"
     expected_highest_y_result = 45
     assert get_highest_y_position(example_data) == expected_highest_y_result
@@ -106,6 +253,20 @@ if __name__ == "__main__":
     expected_successful_shots_count_result = 112
     assert get_successful_shots_count(example_data) == expected_successful_shots_count_result
 
+    if np is not None:
+        assert get_highest_y_position(example_data, engine="numpy") == expected_highest_y_result
+        assert get_successful_shots_count(example_data, engine="numpy") == expected_successful_shots_count_result
+        assert find_valid_velocities_with_numpy(example_data) == find_valid_velocities(example_data)
+
+        larger_data = "target area: x=300..400, y=-400..-300"
+        assert find_valid_velocities_with_numpy(larger_data) == find_valid_velocities(larger_data)
+
+    # The velocities are derived from the target, so distant targets work too
+    distant_data = "target area: x=5000..5200, y=-3000..-2900"
+    assert get_highest_y_position(distant_data) == (2999 * 3000) // 2
+    if np is not None:
+        assert find_valid_velocities_with_numpy(distant_data) == find_valid_velocities(distant_data)
+
     input_file_path = Path(__file__).parent / "input.txt"
     input_data = input_file_path.read_text().splitlines()
 
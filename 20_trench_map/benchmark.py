@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Compare the single process NumPy enhancement with the parallel one (bands over shared memory)
+on a large random image, using the algorithm from the puzzle input.
+
+Usage: ./benchmark.py [--size 20000] [--steps 2] [--workers 1 2 4]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from part1_and_2 import enhance_numpy, enhance_parallel, parse_numpy
+
+
+def run_single_process(img, algorithm, steps):
+    for step in range(steps):
+        img = enhance_numpy(img, algorithm, step)
+    return img
+
+
+def run_parallel(img, algorithm, steps, workers):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for step in range(steps):
+            img = enhance_parallel(img, algorithm, step, executor, bands_count=workers)
+    return img
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=20_000)
+    parser.add_argument("--steps", type=int, default=2)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count()}))
+    args = parser.parse_args()
+
+    input_file_path = Path(__file__).parent / "input.txt"
+    algorithm, _ = parse_numpy(input_file_path.read_text().splitlines())
+    img = np.random.default_rng(seed=20).integers(0, 2, size=(args.size, args.size), dtype=np.uint8)
+
+    start_time = time.perf_counter()
+    expected_img = run_single_process(img, algorithm, args.steps)
+    single_process_time = time.perf_counter() - start_time
+    print(f"size={args.size} steps={args.steps} single_process={single_process_time:.2f}s")
+
+    for workers in args.workers:
+        start_time = time.perf_counter()
+        parallel_img = run_parallel(img, algorithm, args.steps, workers)
+        parallel_time = time.perf_counter() - start_time
+        assert np.array_equal(parallel_img, expected_img)
+        print(f"{workers=} parallel={parallel_time:.2f}s (x{single_process_time / parallel_time:.2f})")
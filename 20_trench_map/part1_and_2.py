@@ -1,9 +1,19 @@
 #!/usr/bin/env python3
 
+import os
+from concurrent.futures import ProcessPoolExecutor
 from functools import partial
 from itertools import chain, product
+from multiprocessing.shared_memory import SharedMemory
 from pathlib import Path
 
+try:
+    import numpy as np
+except ImportError:  # Only required by the "numpy", "buffers" and "parallel" engines (and the benchmark)
+    np = None
+
+BINARY_DIGITS_TO_BITS = bytes.maketrans(b"01", b"\x00\x01")
+
 
 class DefaultList:
     def __init__(self, iterable=None, default=None):
@@ -73,13 +83,212 @@ def enhance(img, algorithm, step):
     )
 
 
-def count_lit_pixels(data, steps):
-    algorithm, img = parse(data)
+def parse_numpy(data):
+    algorithm = np.array([pixel == "#" for pixel in data[0]], dtype=np.uint8)
+    img = np.array([[pixel == "#" for pixel in line] for line in data[2:]], dtype=np.uint8)
+    return algorithm, img
+
+
+def get_background(algorithm, step):
+    """The value of the pixels outside the image before the given step, the way `parse` and `enhance` set it."""
+    return algorithm[0] if step == 0 else algorithm[(step - 1) % 2]
+
+
+def enhance_numpy(img, algorithm, step):
+    # Two pixels of background around the image, so that the 3x3 windows also cover the new border
+    padded_img = np.pad(img, 2, constant_values=get_background(algorithm, step))
+    height, width = img.shape[0] + 2, img.shape[1] + 2
+
+    # Build the 9 bits index of every pixel at once, from the top left pixel of its window to the bottom right one
+    indexes = np.zeros((height, width), dtype=np.uint16)
+    for r, c in product(range(3), range(3)):
+        indexes = (indexes << 1) | padded_img[r : r + height, c : c + width]
+
+    return algorithm[indexes]
+
+
+def enhance_double_buffered(img, algorithm, steps):
+    """
+    Same as calling `enhance_numpy` for each step, but going back and forth between two buffers
+    allocated once (big enough for the final image), and only touching the growing image in them.
+    Return a view of the final image in one of the buffers.
+    """
+    height, width = img.shape
+    # Room for the image to grow by one pixel per step, plus the two pixels of background read by the windows
+    margin = steps + 2
+    front = np.zeros((height + 2 * margin, width + 2 * margin), dtype=np.uint8)
+    back = np.zeros_like(front)
+    indexes = np.zeros(front.shape, dtype=np.uint16)
+    front[margin : margin + height, margin : margin + width] = img
 
     for step in range(steps):
-        img = enhance(img, algorithm, step)
+        # Current image bounds in the buffers
+        top, left = margin - step, margin - step
+        bottom, right = top + height + 2 * step, left + width + 2 * step
+
+        # Two pixels of background around the image
+        background = get_background(algorithm, step)
+        front[top - 2 : top, left - 2 : right + 2] = background
+        front[bottom : bottom + 2, left - 2 : right + 2] = background
+        front[top:bottom, left - 2 : left] = background
+        front[top:bottom, right : right + 2] = background
+
+        # Build the 9 bits index of every pixel of the enhanced image (one pixel bigger on each side) in place
+        enhanced_area = (slice(top - 1, bottom + 1), slice(left - 1, right + 1))
+        area_indexes = indexes[enhanced_area]
+        area_indexes[...] = 0
+        for r, c in product(range(-1, 2), range(-1, 2)):
+            np.left_shift(area_indexes, 1, out=area_indexes)
+            shifted_area = front[top - 1 + r : bottom + 1 + r, left - 1 + c : right + 1 + c]
+            np.bitwise_or(area_indexes, shifted_area, out=area_indexes)
+
+        np.take(algorithm, area_indexes, out=back[enhanced_area], mode="clip")
+        front, back = back, front
+
+    return front[margin - steps : margin + height + steps, margin - steps : margin + width + steps]
+
+
+def enhance_parallel(img, algorithm, step, executor, bands_count):
+    """
+    Same as `enhance_numpy`, but with the enhanced image split into horizontal bands, each computed by a worker
+    of the process pool from the padded image shared with all of them (each band reading one more row above
+    and below it). Bands write directly into a shared output image, which is copied back once complete.
+    """
+    padded_img = np.pad(img, 2, constant_values=get_background(algorithm, step))
+    height, width = img.shape[0] + 2, img.shape[1] + 2
+
+    input_memory = SharedMemory(create=True, size=padded_img.nbytes)
+    output_memory = SharedMemory(create=True, size=height * width)
+    try:
+        np.ndarray(padded_img.shape, dtype=np.uint8, buffer=input_memory.buf)[...] = padded_img
+
+        band_height = -(-height // bands_count)  # Rounded up
+        futures = [
+            executor.submit(
+                _enhance_band,
+                input_memory.name,
+                output_memory.name,
+                (height, width),
+                algorithm,
+                band_start,
+                min(band_start + band_height, height),
+            )
+            for band_start in range(0, height, band_height)
+        ]
+        for future in futures:
+            future.result()
+
+        return np.ndarray((height, width), dtype=np.uint8, buffer=output_memory.buf).copy()
+    finally:
+        input_memory.close()
+        input_memory.unlink()
+        output_memory.close()
+        output_memory.unlink()
+
+
+def _enhance_band(input_name, output_name, shape, algorithm, band_start, band_end):
+    height, width = shape
+    input_memory = SharedMemory(name=input_name)
+    output_memory = SharedMemory(name=output_name)
+    padded_img = np.ndarray((height + 2, width + 2), dtype=np.uint8, buffer=input_memory.buf)
+    enhanced_img = np.ndarray(shape, dtype=np.uint8, buffer=output_memory.buf)
+    try:
+        # Rows `band_start` to `band_end` of the enhanced image are centered on the same rows plus one
+        # in the padded image, so the band reads from `band_start` to `band_end + 2` (its halo included).
+        band_height = band_end - band_start
+        indexes = np.zeros((band_height, width), dtype=np.uint16)
+        for r, c in product(range(3), range(3)):
+            indexes = (indexes << 1) | padded_img[band_start + r : band_end + r, c : c + width]
+
+        enhanced_img[band_start:band_end] = algorithm[indexes]
+    finally:
+        # Views over the buffers must be gone before closing them
+        del padded_img, enhanced_img
+        input_memory.close()
+        output_memory.close()
+
+
+def parse_bitsets(data):
+    algorithm = [int(pixel == "#") for pixel in data[0]]
+    # Each row is an integer, its leftmost pixel being the most significant bit
+    rows = [int("".join("1" if pixel == "#" else "0" for pixel in line), base=2) for line in data[2:]]
+    return algorithm, rows, len(data[2])
+
+
+def enhance_bitsets(rows, width, algorithm, step):
+    background = get_background(algorithm, step)
+    background_pixels = (1 << 2) - 1 if background else 0
+
+    # Two pixels of background around the image, so that the 3x3 windows also cover the new border
+    padded_width = width + 4
+    background_row = (1 << padded_width) - 1 if background else 0
+    padded_rows = [
+        background_row,
+        background_row,
+        *((background_pixels << (width + 2)) | (row << 2) | background_pixels for row in rows),
+        background_row,
+        background_row,
+    ]
+
+    # Shifting and masking a row for each pixel would cost as much as the row is wide, so each row is turned
+    # into bytes of 0 and 1 once (and the enhanced rows are built as strings of digits, converted at the end).
+    padded_rows = [f"{row:0{padded_width}b}".encode().translate(BINARY_DIGITS_TO_BITS) for row in padded_rows]
+    algorithm_digits = "".join(map(str, algorithm))
+
+    enhanced_rows = []
+    for top, middle, bottom in zip(padded_rows, padded_rows[1:], padded_rows[2:]):
+        # The 9 bits index is kept as a rolling window: moving one pixel to the right drops the left column
+        # of each row of 3 bits, and shifts in the next column of three bits.
+        index = 0
+        enhanced_digits = []
+        for top_bit, middle_bit, bottom_bit in zip(top, middle, bottom):
+            index = ((index << 1) & 0b110_110_110) | (top_bit << 6) | (middle_bit << 3) | bottom_bit
+            enhanced_digits.append(algorithm_digits[index])
+        # The window was still filling up for the first 2 columns
+        enhanced_rows.append(int("".join(enhanced_digits[2:]), base=2))
+
+    return enhanced_rows, width + 2
+
+
+def count_lit_pixels(data, steps, engine="lists", workers=None):
+    match engine:
+        case "lists":
+            algorithm, img = parse(data)
+
+            for step in range(steps):
+                img = enhance(img, algorithm, step)
+
+            lit_pixels_count = sum(map(lambda pixel: pixel == "1", chain.from_iterable(img)))
+        case "numpy":
+            algorithm, img = parse_numpy(data)
+
+            for step in range(steps):
+                img = enhance_numpy(img, algorithm, step)
+
+            lit_pixels_count = int(img.sum())
+        case "buffers":
+            algorithm, img = parse_numpy(data)
+            img = enhance_double_buffered(img, algorithm, steps)
+            lit_pixels_count = int(np.count_nonzero(img))
+        case "parallel":
+            algorithm, img = parse_numpy(data)
+
+            workers = workers or os.cpu_count()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for step in range(steps):
+                    img = enhance_parallel(img, algorithm, step, executor, bands_count=workers)
+
+            lit_pixels_count = int(img.sum())
+        case "bitsets":
+            algorithm, rows, width = parse_bitsets(data)
+
+            for step in range(steps):
+                rows, width = enhance_bitsets(rows, width, algorithm, step)
+
+            lit_pixels_count = sum(row.bit_count() for row in rows)
+        case _:
+            raise ValueError(f"Unknown engine ‘{engine}’")
 
-    lit_pixels_count = sum(map(lambda pixel: pixel == "1", chain.from_iterable(img)))
     return lit_pixels_count
 
 
@@ -105,6 +314,15 @@ if __name__ == "__main__":
     expected_result_after_50_steps = 3351
     assert count_lit_pixels(example_data, 2) == expected_result_after_2_steps
     assert count_lit_pixels(example_data, 50) == expected_result_after_50_steps
+    if np is not None:
+        assert count_lit_pixels(example_data, 2, engine="numpy") == expected_result_after_2_steps
+        assert count_lit_pixels(example_data, 50, engine="numpy") == expected_result_after_50_steps
+        assert count_lit_pixels(example_data, 2, engine="buffers") == expected_result_after_2_steps
+        assert count_lit_pixels(example_data, 50, engine="buffers") == expected_result_after_50_steps
+        assert count_lit_pixels(example_data, 2, engine="parallel", workers=3) == expected_result_after_2_steps
+        assert count_lit_pixels(example_data, 50, engine="parallel", workers=3) == expected_result_after_50_steps
+    assert count_lit_pixels(example_data, 2, engine="bitsets") == expected_result_after_2_steps
+    assert count_lit_pixels(example_data, 50, engine="bitsets") == expected_result_after_50_steps
 
     input_file_path = Path(__file__).parent / "input.txt"
     input_data = input_file_path.read_text().splitlines()
@@ -113,3 +331,12 @@ if __name__ == "__main__":
     print(f"{result_after_2_steps=}")
     result_after_50_steps = count_lit_pixels(input_data, 50)
     print(f"{result_after_50_steps=}")
+
+    if np is not None:
+        assert count_lit_pixels(input_data, 2, engine="numpy") == result_after_2_steps
+        assert count_lit_pixels(input_data, 50, engine="numpy") == result_after_50_steps
+        assert count_lit_pixels(input_data, 2, engine="buffers") == result_after_2_steps
+        assert count_lit_pixels(input_data, 50, engine="buffers") == result_after_50_steps
+        assert count_lit_pixels(input_data, 2, engine="parallel", workers=2) == result_after_2_steps
+    assert count_lit_pixels(input_data, 2, engine="bitsets") == result_after_2_steps
+    assert count_lit_pixels(input_data, 50, engine="bitsets") == result_after_50_steps
@@ -2,83 +2,502 @@
 
 import operator
 import time
-from dataclasses import dataclass
-from itertools import product
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import cache, lru_cache
+from itertools import chain, product
 from pathlib import Path
 
+try:
+    import numpy as np
+except ImportError:  # Only required by `process_batch` and `check_model_numbers`
+    np = None
 
-@dataclass
-class Registers:
-    w: int = 0
-    x: int = 0
-    y: int = 0
-    z: int = 0
+
+REGISTER_NAMES = "wxyz"
+REGISTER_INDEXES = {name: idx for idx, name in enumerate(REGISTER_NAMES)}
+PARSED_PROGRAMS_CACHE_SIZE = 16
+BATCH_CHUNK_SIZE = 2**16
+
+
+def truncated_div(left, right):
+    """Integer division rounding toward zero (rather than toward negative infinity like `//`)."""
+    quotient = abs(left) // abs(right)
+    return quotient if (left < 0) == (right < 0) else -quotient
 
 
 OPERATIONS = {
     "add": operator.add,
     "mul": operator.mul,
-    "div": operator.floordiv,
+    "div": truncated_div,
     "mod": operator.mod,
     "eql": lambda left, right: int(left == right),
 }
 
+INP, ADD, MUL, DIV, MOD, EQL = OPCODES = range(6)
+OPCODE_NAMES = ["inp", "add", "mul", "div", "mod", "eql"]
+OPCODE_OPERATIONS = [OPERATIONS.get(name) for name in OPCODE_NAMES]
+IMMEDIATE = 8  # Added to the opcode when the second operand is a value rather than a register
 
-def process(program_data, input_data):
-    input_data = list(reversed(input_data))
-    registers = Registers()
 
+def parse_program(program_data):
+    """
+    Turn the program into `(opcode, destination_register_idx, source_register_idx_or_value)` records,
+    caching the result so that the same program is only ever parsed once.
+    """
+    return _parse_program(tuple(program_data))
+
+
+@lru_cache(maxsize=PARSED_PROGRAMS_CACHE_SIZE)
+def _parse_program(program_data):
+    # Keyed on the content of the program (rather than the list, which can't be hashed)
+    instructions = []
     for line in program_data:
         match line.split():
-            case "inp", var_name:
-                setattr(registers, var_name, input_data.pop())
-            case operation_name, left_name, right_name_or_value:
-                left = getattr(registers, left_name)
-                right = (
-                    getattr(registers, right_name_or_value)
-                    if right_name_or_value.isalpha()
-                    else int(right_name_or_value)
-                )
-
-                if (
-                    (operation_name == "div" and right == 0)
-                    or (operation_name == "mod" and left < 0)
-                    or (operation_name == "mod" and left <= 0)
-                ):
-                    break
-
-                operation = OPERATIONS[operation_name]
-                setattr(registers, left_name, operation(left, right))
+            case "inp", var_name if var_name in REGISTER_INDEXES:
+                instructions.append((INP, REGISTER_INDEXES[var_name], 0))
+            case operation_name, left_name, right_name_or_value if (
+                operation_name in OPERATIONS and left_name in REGISTER_INDEXES
+            ):
+                opcode, left_idx = OPCODE_NAMES.index(operation_name), REGISTER_INDEXES[left_name]
+                if right_name_or_value in REGISTER_INDEXES:
+                    instructions.append((opcode, left_idx, REGISTER_INDEXES[right_name_or_value]))
+                else:
+                    try:
+                        instructions.append((opcode + IMMEDIATE, left_idx, int(right_name_or_value)))
+                    except ValueError:
+                        raise ValueError(f"Invalid instruction ‘{line}’") from None
             case _:
                 raise ValueError(f"Invalid instruction ‘{line}’")
+
+    return tuple(instructions)
+
+
+def process(program_data, input_data):
+    input_data = list(reversed(input_data))
+    registers = [0] * len(REGISTER_NAMES)
+
+    for opcode, left_idx, right_idx_or_value in parse_program(program_data):
+        if opcode == INP:
+            registers[left_idx] = input_data.pop()
+            continue
+
+        left = registers[left_idx]
+        if opcode >= IMMEDIATE:
+            opcode, right = opcode - IMMEDIATE, right_idx_or_value
+        else:
+            right = registers[right_idx_or_value]
+
+        if (opcode == DIV and right == 0) or (opcode == MOD and (left < 0 or right <= 0)):
+            break
+
+        registers[left_idx] = OPCODE_OPERATIONS[opcode](left, right)
     else:
-        return registers.z == 0, registers.w, registers.x, registers.y, registers.z
-    return False, registers.w, registers.x, registers.y, registers.z
+        return registers[-1] == 0, *registers
+    return False, *registers
+
+
+def process_batch(program_data, input_data):
+    """
+    Same as `process`, but for many inputs at once (one per row of `input_data`),
+    each register holding an array with the value for every input.
+    Inputs are processed in chunks small enough for their registers to stay in the CPU caches.
+    """
+    input_data = np.asarray(input_data, dtype=np.int64)
+    instructions = parse_program(program_data)
+    registers = np.zeros((len(REGISTER_NAMES), len(input_data)), dtype=np.int64)
+    # Inputs stop being processed (like `break` in `process`) after their first invalid operation
+    running = np.ones(len(input_data), dtype=bool)
+
+    for chunk_start in range(0, len(input_data), BATCH_CHUNK_SIZE):
+        chunk = slice(chunk_start, chunk_start + BATCH_CHUNK_SIZE)
+        _process_chunk(instructions, input_data[chunk], registers[:, chunk], running[chunk])
+
+    is_valid = running & (registers[-1] == 0)
+    return is_valid, *registers
+
+
+def _process_chunk(instructions, input_data, registers, running):
+    # Updates `registers` and `running` (views on the whole batch) in place, with preallocated temporary arrays
+    values = np.empty(len(input_data), dtype=np.int64)
+    divisors = np.empty(len(input_data), dtype=np.int64)
+    mask = np.empty(len(input_data), dtype=bool)
+    other_mask = np.empty(len(input_data), dtype=bool)
+    where = True  # Becomes `running` once some input stops
+    input_idx = 0
+
+    def stop(invalid):
+        nonlocal where
+        if invalid.any():
+            np.logical_and(running, np.logical_not(invalid, out=invalid), out=running)
+            where = running
+
+    for opcode, left_idx, right_idx_or_value in instructions:
+        left = registers[left_idx]
+        if opcode == INP:
+            np.copyto(left, input_data[:, input_idx], where=where)
+            input_idx += 1
+            continue
+
+        is_immediate = opcode >= IMMEDIATE
+        if is_immediate:
+            opcode, right = opcode - IMMEDIATE, right_idx_or_value
+        else:
+            right = registers[right_idx_or_value]
+
+        if opcode == ADD:
+            np.add(left, right, out=left, where=where)
+        elif opcode == MUL:
+            np.multiply(left, right, out=left, where=where)
+        elif opcode == EQL:
+            np.equal(left, right, out=mask)
+            np.copyto(left, mask, where=where)
+        elif opcode == DIV:
+            if is_immediate:
+                if right == 0:  # Invalid for every input
+                    running[:] = False
+                    return
+                elif right == 1:
+                    continue
+                divisor = abs(right)
+            else:
+                stop(np.equal(right, 0, out=mask))
+                divisor = np.maximum(np.abs(right, out=divisors), 1, out=divisors)
+
+            # Rounding toward zero: divide the absolute values, then negate when the operands have different signs
+            np.floor_divide(np.abs(left, out=values), divisor, out=values)
+            np.less(left, 0, out=mask)
+            if not is_immediate:
+                np.not_equal(mask, np.less(right, 0, out=other_mask), out=mask)
+            elif right < 0:
+                np.logical_not(mask, out=mask)
+            np.negative(values, out=values, where=mask)
+            np.copyto(left, values, where=where)
+        elif opcode == MOD:
+            if is_immediate:
+                if right <= 0:  # Invalid for every input
+                    running[:] = False
+                    return
+                divisor = right
+            else:
+                divisor = np.maximum(right, 1, out=divisors)
+
+            np.less(left, 0, out=mask)
+            if not is_immediate:
+                np.logical_or(mask, np.less_equal(right, 0, out=other_mask), out=mask)
+            stop(mask)
+            np.remainder(left, divisor, out=left, where=where)
+
+
+def check_model_numbers(program_data, model_numbers):
+    """Tell which of the 14-digit model numbers (given as an array of integers) are valid."""
+    remaining = np.array(model_numbers, dtype=np.int64)
+    # Column major, so that each digit `process_batch` reads is contiguous
+    digits = np.empty((len(remaining), 14), dtype=np.int64, order="F")
+    for digit_idx in range(13, -1, -1):
+        np.divmod(remaining, 10, out=(remaining, digits[:, digit_idx]))
+
+    is_valid, *_ = process_batch(program_data, digits)
+    return is_valid & (digits != 0).all(axis=1)  # Model numbers never contain a 0
+
+
+def compile_program(program_data):
+    """
+    Turn the program into the source of a single Python function working on local variables,
+    which then behaves like `process` without parsing instructions or looking up registers on every run.
+    """
+    return _compile(program_data, registers=(), result="z == 0, w, x, y, z", invalid_result="False, w, x, y, z")
+
+
+def compile_block(block):
+    """
+    Same as `compile_program`, but the function takes the initial value of `z` after the input data,
+    and only returns the final value of `z` (or `None` for invalid operations).
+    """
+    return _compile(block, registers=("z",), result="z", invalid_result="None")
+
+
+def _compile(program_data, registers, result, invalid_result):
+    # Generated from the parsed instructions, so only register names and integers ever make it into the source
+    invalid = f"return {invalid_result}"
+    lines = [
+        f"def run({', '.join(['input_data', *registers])}):",
+        *(f"    {name} = 0" for name in REGISTER_NAMES if name not in registers),
+    ]
+    input_idx = 0
+
+    for opcode, left_idx, right_idx_or_value in parse_program(program_data):
+        left = REGISTER_NAMES[left_idx]
+        if opcode == INP:
+            lines.append(f"    {left} = input_data[{input_idx}]")
+            input_idx += 1
+            continue
+
+        is_immediate = opcode >= IMMEDIATE
+        opcode = opcode - IMMEDIATE if is_immediate else opcode
+        right = int(right_idx_or_value) if is_immediate else REGISTER_NAMES[right_idx_or_value]
+
+        if opcode == ADD:
+            lines.append(f"    {left} = {left} + {right}")
+        elif opcode == MUL:
+            lines.append(f"    {left} = {left} * {right}")
+        elif opcode == DIV:
+            if not is_immediate:
+                lines.append(f"    if {right} == 0: {invalid}")
+                lines.append(f"    {left} = truncated_div({left}, {right})")
+            elif right == 0:
+                lines.append(f"    {invalid}")
+            elif right > 0:  # The usual case, avoids a function call
+                lines.append(f"    {left} = {left} // {right} if {left} >= 0 else -(-{left} // {right})")
+            else:
+                lines.append(f"    {left} = truncated_div({left}, {right})")
+        elif opcode == MOD:
+            if not is_immediate:
+                lines.append(f"    if {left} < 0 or {right} <= 0: {invalid}")
+            elif right <= 0:
+                lines.append(f"    {invalid}")
+            else:
+                lines.append(f"    if {left} < 0: {invalid}")
+            lines.append(f"    {left} = {left} % {right}")
+        elif opcode == EQL:
+            lines.append(f"    {left} = int({left} == {right})")
+
+    lines.append(f"    return {result}")
+
+    namespace = {"truncated_div": truncated_div}
+    exec("\n".join(lines), namespace)
+    return namespace["run"]
+
+
+def split_blocks(program_data):
+    """Split the program before each `inp` instruction, so that each block reads a single digit."""
+    blocks = []
+    for line in program_data:
+        if line.startswith("inp") or not blocks:
+            blocks.append([])
+        blocks[-1].append(line)
+    return blocks
+
+
+def iter_registers_ranges(program_data, registers_ranges=None):
+    """
+    Yield the range `(low, high)` each register can be in after each instruction, given digits from 1 to 9,
+    starting from the given ranges (all registers at 0 by default).
+    Yield `None` (and stop) once an operation is certain to be invalid.
+    """
+    registers_ranges = registers_ranges or {name: (0, 0) for name in REGISTER_NAMES}
+    ranges = [registers_ranges[name] for name in REGISTER_NAMES]
+
+    for instruction in parse_program(program_data):
+        if not update_registers_ranges(ranges, *instruction):
+            yield None
+            return
+
+        yield dict(zip(REGISTER_NAMES, ranges))
+
+
+def update_registers_ranges(ranges, opcode, left_idx, right_idx_or_value):
+    """Update the ranges (listed in register order) after an instruction, tell whether it might be valid."""
+    if opcode == INP:
+        ranges[left_idx] = (1, 9)
+        return True
+
+    if opcode >= IMMEDIATE:
+        opcode, right = opcode - IMMEDIATE, (right_idx_or_value,) * 2
+    else:
+        right = ranges[right_idx_or_value]
+
+    ranges[left_idx] = get_operation_range(opcode, ranges[left_idx], right)
+    return ranges[left_idx] is not None
+
+
+def get_operation_range(opcode, left, right):
+    """The range of the result of an operation over two ranges, or `None` when it can only be invalid."""
+    (left_low, left_high), (right_low, right_high) = left, right
+
+    if opcode == ADD:
+        return left_low + right_low, left_high + right_high
+    elif opcode == MUL:
+        products = [left * right for left in (left_low, left_high) for right in (right_low, right_high)]
+        return min(products), max(products)
+    elif opcode == DIV:
+        if right_low == right_high == 0:
+            return None
+        elif right_low <= 0 <= right_high:  # Quotients can't get further from 0 than the dividend
+            bound = max(abs(left_low), abs(left_high))
+            return -bound, bound
+        else:  # Monotonic in both operands, so the extremes are at the corners
+            quotients = [
+                truncated_div(left, right) for left in (left_low, left_high) for right in (right_low, right_high)
+            ]
+            return min(quotients), max(quotients)
+    elif opcode == MOD:
+        # Only the non negative dividends and positive divisors are valid
+        left_low, right_low = max(left_low, 0), max(right_low, 1)
+        if left_low > left_high or right_low > right_high:
+            return None
+        elif right_low == right_high and left_low // right_low == left_high // right_low:
+            return left_low % right_low, left_high % right_low  # Doesn't wrap around
+        else:
+            return 0, min(left_high, right_high - 1)
+    elif opcode == EQL:
+        if left_low == left_high == right_low == right_high:
+            return 1, 1
+        elif left_high < right_low or right_high < left_low:
+            return 0, 0
+        else:
+            return 0, 1
+    else:
+        raise ValueError(f"Invalid opcode ‘{opcode}’")
+
+
+def can_end_with_z_zero(instructions, registers_ranges):
+    """
+    Whether, starting with registers in the given ranges, there might be digits for which the program ends
+    with `z == 0`. Same as `iter_registers_ranges` (only keeping the last ranges), but over parsed instructions
+    without building intermediate dicts, since it runs many times.
+    """
+    ranges = [registers_ranges[name] for name in REGISTER_NAMES]
+
+    for instruction in instructions:
+        if not update_registers_ranges(ranges, *instruction):
+            return False
+
+    low, high = ranges[-1]
+    return low <= 0 <= high
+
+
+def get_z_thresholds(blocks):
+    """
+    For each block, the lowest `z` from which the rest of the program can no longer end with `z == 0`,
+    according to the ranges analysis (so any search state at or above it can be dropped along with all its digits).
+    Registers start each block within the ranges found by analysing the program from its start,
+    and the threshold is found by bisection, since a narrower starting range never gives a wider result.
+    """
+    program_data = list(chain.from_iterable(blocks))
+    instructions = parse_program(program_data)
+    ranges_after_instruction = list(iter_registers_ranges(program_data))
+    if ranges_after_instruction and ranges_after_instruction[-1] is None:  # Always invalid, nothing to search
+        return [0] * len(blocks)
+
+    thresholds = []
+    block_start = 0
+    for block in blocks:
+        remaining_instructions = instructions[block_start:]
+        start_ranges = (
+            ranges_after_instruction[block_start - 1] if block_start else {name: (0, 0) for name in REGISTER_NAMES}
+        )
+        block_start += len(block)
+
+        z_low, z_high = start_ranges["z"]
+        low, high = z_low, z_high + 1  # `z_high + 1` stands for "no threshold"
+        while low < high:
+            middle = (low + high) // 2
+            if can_end_with_z_zero(remaining_instructions, {**start_ranges, "z": (middle, z_high)}):
+                low = middle + 1
+            else:
+                high = middle
+        thresholds.append(low)
+
+    return thresholds
+
+
+def find_model_number(data, digits, prefix=()):
+    """
+    Search the first valid model number (trying digits in the given order, after the optional prefix)
+    block by block. Each block is assumed to only depend on its digit and on the `z` left by the previous block
+    (MONAD blocks reset `w`, `x` and `y` before reading them), so dead ends are memoised on `(block_idx, z)`.
+    """
+    blocks = split_blocks(data)
+    z_thresholds = get_z_thresholds(blocks)
+    blocks = list(map(compile_block, blocks))
+
+    @cache
+    def search(block_idx, z):
+        if block_idx == len(blocks):
+            return () if z == 0 else None
+
+        if z >= z_thresholds[block_idx]:  # No digits left can bring it back to 0
+            return None
+
+        for digit in digits:
+            next_z = blocks[block_idx]((digit,), z)
+            if next_z is not None and (next_digits := search(block_idx + 1, next_z)) is not None:
+                return (digit, *next_digits)
+
+        return None
+
+    z = 0
+    for block, digit in zip(blocks, prefix):
+        if (z := block((digit,), z)) is None:
+            return None
+
+    number = search(len(prefix), z)
+    return int("".join(map(str, (*prefix, *number)))) if number is not None else None
+
+
+def find_model_number_in_parallel(data, digits, prefix_length=1, workers=None):
+    """
+    Same as `find_model_number`, but with the search split into shards (one per prefix of `prefix_length` digits)
+    spread across a process pool. Shards are ranked like the digits, so the result is the one of the first
+    shard finding a valid model number, as soon as all the shards ranked before it found none.
+    """
+    shards = list(product(digits, repeat=prefix_length))
+    results = {}
+    next_rank = 0
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {
+            executor.submit(_search_shard, data, digits, prefix): rank for rank, prefix in enumerate(shards)
+        }
+        for future in as_completed(futures):
+            rank = futures[future]
+            results[rank], elapsed_time = future.result()
+            print(
+                f"Shard {''.join(map(str, shards[rank]))}: {results[rank]} "
+                f"(time={elapsed_time:.2f}s, {len(results)}/{len(shards)} done)"
+            )
+
+            while next_rank in results:
+                if results[next_rank] is not None:
+                    return results[next_rank]
+                next_rank += 1
+    finally:
+        # Shards still running are left to finish on their own, but pending ones are dropped
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return None
+
+
+def _search_shard(data, digits, prefix):
+    start_time = time.monotonic()
+    result = find_model_number(data, digits, prefix)
+    return result, time.monotonic() - start_time
 
 
 def get_largest_valid_model_number(data):
-    model_numbers = product(*[range(9, 0, -1) for _ in range(14)])
-    for number in model_numbers:
-        # print(f"Checking {''.join(map(str, number))}")
-        is_valid, w, x, y, z = process(data, number)
-        if is_valid:
-            return int("".join(map(str, number)))
+    return find_model_number(data, digits=range(9, 0, -1))
 
 
 if __name__ == "__main__":
     example_program_data = ["inp x", "mul x -1"]
     example_input_data = [2]
     is_valid, w, x, y, z = process(example_program_data, example_input_data)
+    assert compile_program(example_program_data)(example_input_data) == (is_valid, w, x, y, z)
     assert (is_valid, w, x, y, z) == (True, 0, -example_input_data[0], 0, 0)
 
+    assert [ranges["x"] for ranges in iter_registers_ranges(example_program_data)] == [(1, 9), (-9, -1)]
+
     example_program_data = ["inp z", "inp x", "mul z 3", "eql z x"]
     example_input_data = [2, 3]
     is_valid, w, x, y, z = process(example_program_data, example_input_data)
+    assert compile_program(example_program_data)(example_input_data) == (is_valid, w, x, y, z)
     assert (is_valid, w, x, y, z) == (True, 0, example_input_data[1], 0, 0)
 
     example_program_data = ["inp z", "inp x", "mul z 3", "eql z x"]
     example_input_data = [2, 6]
     is_valid, w, x, y, z = process(example_program_data, example_input_data)
+    assert compile_program(example_program_data)(example_input_data) == (is_valid, w, x, y, z)
     assert (is_valid, w, x, y, z) == (False, 0, example_input_data[1], 0, 1)
 
     example_program_data = [
@@ -96,8 +515,49 @@ if __name__ == "__main__":
     ]
     example_input_data = [9]
     is_valid, w, x, y, z = process(example_program_data, example_input_data)
+    assert compile_program(example_program_data)(example_input_data) == (is_valid, w, x, y, z)
     assert (is_valid, w, x, y, z) == (False, 1, 0, 0, 1)
 
+    example_program_data = ["inp w", "inp x", "div w x", "mod x 5", "inp y", "mod y x"]
+    for example_input_data in ([-7, 2, 1], [7, -2, 1], [7, 0, 1], [7, 3, 0], [7, 5, 1]):
+        result = process(example_program_data, example_input_data)
+        assert compile_program(example_program_data)(example_input_data) == result
+    assert process(example_program_data, [-7, 2, 1]) == (True, -3, 2, 1, 0)
+    assert parse_program(example_program_data) == (
+        (INP, 0, 0),
+        (INP, 1, 0),
+        (DIV, 0, 1),
+        (MOD + IMMEDIATE, 1, 5),
+        (INP, 2, 0),
+        (MOD, 2, 1),
+    )
+    assert parse_program(example_program_data) is parse_program(list(example_program_data))
+    invalid_programs_data = [["inp q"], ["inp w", "add w foo"], ["inp wx"], ['add w __import__("os")']]
+    for invalid_program_data in invalid_programs_data:
+        for run in (lambda program_data: process(program_data, [1]), compile_program):
+            try:
+                run(invalid_program_data)
+            except ValueError as error:
+                assert str(error) == f"Invalid instruction ‘{invalid_program_data[-1]}’"
+            else:
+                assert False, f"Invalid program {invalid_program_data} was accepted"
+    assert [ranges["w"] for ranges in iter_registers_ranges(example_program_data)][:3] == [(1, 9), (1, 9), (0, 9)]
+    assert list(iter_registers_ranges(["inp w", "mod w 0"])) == [
+        {"w": (1, 9), "x": (0, 0), "y": (0, 0), "z": (0, 0)},
+        None,
+    ]
+
+    if np is not None:
+        example_batch_input_data = [[-7, 2, 1], [7, -2, 1], [7, 0, 1], [7, 3, 0], [7, 5, 1]]
+        batch_results = process_batch(example_program_data, example_batch_input_data)
+        for example_input_data, *batch_result in zip(example_batch_input_data, *batch_results):
+            assert process(example_program_data, example_input_data) == tuple(batch_result)
+        example_program_data = ["inp w", "div w -2", "inp x", "mod x 3", "add z x", "mod w 0"]
+        example_batch_input_data = [[-7, 2], [7, 4], [0, -1]]
+        batch_results = process_batch(example_program_data, example_batch_input_data)
+        for example_input_data, *batch_result in zip(example_batch_input_data, *batch_results):
+            assert process(example_program_data, example_input_data) == tuple(batch_result)
+
     input_file_path = Path(__file__).parent / "input.txt"
     input_data = input_file_path.read_text().splitlines()
 
@@ -105,3 +565,14 @@ if __name__ == "__main__":
     result = get_largest_valid_model_number(input_data)
     end_time = time.monotonic()
     print(f"{result=} (time={end_time-start_time:.2f}s")
+    assert process(input_data, list(map(int, str(result))))[0]
+    assert find_model_number(input_data, range(9, 0, -1), prefix=(2, 9)) == result
+    assert find_model_number(input_data, range(9, 0, -1), prefix=(3,)) is None
+
+    start_time = time.monotonic()
+    parallel_result = find_model_number_in_parallel(input_data, range(9, 0, -1), prefix_length=2)
+    end_time = time.monotonic()
+    print(f"{parallel_result=} (time={end_time-start_time:.2f}s)")
+    assert parallel_result == result
+    if np is not None:
+        assert check_model_numbers(input_data, [result, result - 1, 10**13]).tolist() == [True, False, False]
@@ -1,19 +1,21 @@
 #!/usr/bin/env python3
 
+import time
 from pathlib import Path
 
+from part1 import find_model_number, process
 
-def func(data):
-    return data
 
+def get_smallest_valid_model_number(data):
+    return find_model_number(data, digits=range(1, 10))
 
-if __name__ == "__main__":
-    example_data = []
-    example_expected_result = 0
-    assert func(example_data) == example_expected_result
 
+if __name__ == "__main__":
     input_file_path = Path(__file__).parent / "input.txt"
     input_data = input_file_path.read_text().splitlines()
 
-    result = func(input_data)
-    print(f"{result=}")
+    start_time = time.monotonic()
+    result = get_smallest_valid_model_number(input_data)
+    end_time = time.monotonic()
+    print(f"{result=} (time={end_time-start_time:.2f}s)")
+    assert process(input_data, list(map(int, str(result))))[0]